@@ -0,0 +1,142 @@
+"""
+Per-message cost of the message filter.
+Compares the invite check as the Filter cog used to run it, compiling
+its regex for every message, with the cached GuildFilter, and a loop
+running one search per banned word with the single alternation
+`compile_word_filter` builds.
+Run from the repository root:
+python -m bench.filters [--messages 20000] [--words 10 100 500]
+"""
+import argparse
+import random
+import re
+import string
+import timeit
+
+from cogs.utils.filters import GuildFilter, compile_word_filter, word_pattern
+
+CHAT = (
+    'lol', 'same', 'gm everyone', 'anyone up for ranked tonight?',
+    'that patch notes thread is wild', 'brb getting food',
+    'can a mod check the pins', 'who is streaming later',
+    'I think the boss fight in act 3 is way harder than it looks',
+    'ok but have you tried turning it off and on again',
+)
+LINKS = (
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://twitter.com/someone/status/1234567890',
+    'check https://github.com/dashwav/yin-bot/issues',
+    'https://tenor.com/view/cat-typing-gif-12345',
+)
+INVITES = (
+    'join us discord.gg/abcdef',
+    'https://discord.com/invite/Xyz123 best server',
+    'discordapp.com/invite/qwerty come hang out',
+)
+
+
+def corpus(size: int, seed: int = 2020) -> list:
+    """
+    Returns chat messages with the occasional link, mention and invite
+    About 1 in 12 messages has a link and 1 in 200 an invite
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < 0.005:
+            messages.append(rng.choice(INVITES))
+        elif roll < 0.085:
+            messages.append(rng.choice(LINKS))
+        elif roll < 0.15:
+            messages.append(f'<@{rng.randrange(10 ** 17, 10 ** 18)}> '
+                            + rng.choice(CHAT))
+        else:
+            messages.append(' '.join(
+                rng.choice(CHAT) for _ in range(rng.randint(1, 3))))
+    return messages
+
+
+def banned_words(count: int, seed: int = 2020) -> dict:
+    """
+    Returns `count` filter entries, mostly words and a few regexes
+    """
+    rng = random.Random(seed)
+    words = {}
+    while len(words) < count:
+        word = ''.join(
+            rng.choice(string.ascii_lowercase)
+            for _ in range(rng.randint(4, 10)))
+        if len(words) % 20 == 0:
+            words[f'{word[:3]}+{word[3:]}'] = True
+        else:
+            words[word] = False
+    return words
+
+
+def old_invite_check(content: str) -> bool:
+    """The invite check from before the filter engine"""
+    regexp = re.compile(
+        r'(discord.gg\/)[a-zA-Z0-9]{0,7}|'
+        r'(discordapp.com\/invite\/)[a-zA-Z0-9]{0,7}'
+    )
+    return bool(regexp.search(content))
+
+
+def per_word_filter(filter_words: dict):
+    """
+    One compiled regex per entry, searched one after the other
+    """
+    regexes = [
+        re.compile(word_pattern(pattern, is_regex), re.IGNORECASE)
+        for pattern, is_regex in filter_words.items()
+    ]
+
+    def matches(content: str) -> bool:
+        for regex in regexes:
+            if regex.search(content):
+                return True
+        return False
+    return matches
+
+
+def per_message(check, messages: list, repeat: int) -> float:
+    """
+    Returns the best microseconds per message over `repeat` runs
+    """
+    def run():
+        for content in messages:
+            check(content)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(messages) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--words', type=int, nargs='+',
+                        default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    messages = corpus(args.messages)
+
+    print(f'{len(messages)} messages, best of {args.repeat} runs')
+    invites = GuildFilter(block_invites=True)
+    print('invites')
+    print(f'  compile per message  '
+          f'{per_message(old_invite_check, messages, args.repeat):7.2f}us')
+    print(f'  GuildFilter          '
+          f'{per_message(invites.matches, messages, args.repeat):7.2f}us')
+    for count in args.words:
+        filter_words = banned_words(count)
+        combined = GuildFilter(
+            word_regexes=compile_word_filter(filter_words))
+        print(f'{count} banned words')
+        print(f'  one search per word  '
+              f'{per_message(per_word_filter(filter_words), messages, args.repeat):7.2f}us')  # noqa
+        print(f'  combined filter      '
+              f'{per_message(combined.matches, messages, args.repeat):7.2f}us')
+
+
+if __name__ == '__main__':
+    main()
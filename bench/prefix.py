@@ -0,0 +1,140 @@
+"""
+Per-message overhead of deciding whether a message could be a command.
+Compares the old path, where every message went through discord.py's
+get_context (a StringView, a Context and get_pre's try/except, logging
+every miss) before the prefix was checked, with the
+MessageContext.maybe_command fast path on ServerSettings.
+Run from the repository root:
+python -m bench.prefix [--messages 20000]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+import discord
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from bench.filters import corpus
+from cogs.utils.db_utils import ServerSettings
+from cogs.utils.messages import MessageContext
+
+KNOWN_GUILD = 1
+MISSING_GUILD = 2
+
+
+class Author():
+    __slots__ = ('bot',)
+
+    def __init__(self, bot: bool = False):
+        self.bot = bot
+
+
+class Guild():
+    __slots__ = ('id',)
+
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+
+
+class Message():
+    __slots__ = ('author', 'guild', 'content', '_state')
+
+    def __init__(self, guild, content: str):
+        self.author = Author()
+        self.guild = guild
+        self.content = content
+        self._state = None
+
+
+class OldBot():
+    """
+    get_pre as it was before ServerSettings, called the way
+    Bot.get_context called it for every message
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.server_settings = {KNOWN_GUILD: {'prefix': '-'}}
+
+    async def get_pre(self, bot, message):
+        try:
+            return self.server_settings[message.guild.id]['prefix']
+        except Exception as e:
+            self.logger.info(f'{e}')
+            return '-'
+
+    async def maybe_command(self, message) -> bool:
+        view = StringView(message.content)
+        commands.Context(prefix=None, view=view, bot=self, message=message)
+        prefix = await discord.utils.maybe_coroutine(
+            self.get_pre, self, message)
+        return view.skip_string(prefix)
+
+
+class NewBot():
+    """The fast path the gate runs before any command processing"""
+
+    def __init__(self):
+        self.server_settings = ServerSettings(
+            {KNOWN_GUILD: {'prefix': '-'}})
+
+    async def maybe_command(self, message) -> bool:
+        return MessageContext(self, message).maybe_command
+
+
+def messages_for(guild_id: int, size: int) -> list:
+    """
+    Chat from the corpus with 1 in 50 messages a command
+    """
+    rng = random.Random(guild_id)
+    guild = Guild(guild_id)
+    return [
+        Message(guild, '-help' if rng.random() < 0.02 else content)
+        for content in corpus(size)
+    ]
+
+
+async def per_message(bot, messages: list, repeat: int) -> float:
+    """
+    Returns the best microseconds per message over `repeat` runs
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            await bot.maybe_command(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e6
+
+
+async def run(size: int, repeat: int):
+    # the bot logs at INFO, the handler discards so only the call is timed
+    logger = logging.getLogger('yinbot-bench')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    print(f'{size} messages, best of {repeat} runs')
+    for name, guild_id in (('known guild', KNOWN_GUILD),
+                           ('guild missing from settings', MISSING_GUILD)):
+        messages = messages_for(guild_id, size)
+        old = await per_message(OldBot(logger), messages, repeat)
+        new = await per_message(NewBot(), messages, repeat)
+        print(name)
+        print(f'  get_context      {old:7.2f}us')
+        print(f'  maybe_command    {new:7.2f}us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.get_event_loop().run_until_complete(
+        run(args.messages, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
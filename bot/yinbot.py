@@ -2,7 +2,7 @@
 
 import subprocess
 import datetime
-from time import time, sleep
+from time import time
 
 import yappi
 import gila
@@ -10,8 +10,16 @@ import discord
 from logging import Formatter, StreamHandler, getLogger
 from discord.ext.commands import Bot
 
-from cogs.utils.db_utils import PostgresController
+from cogs.utils.db_utils import PostgresController, ServerSettings
 from cogs.utils import embeds
+from cogs.utils.joins import JoinPipeline
+from cogs.utils.messages import MessageGate
+from cogs.utils.reconcile import GuildReconciler
+from cogs.utils.roles import RoleIndex
+from cogs.utils.startup import StartupTimer, retry_with_backoff
+
+
+DEFAULT_PREFIX = '-'
 
 
 class Yinbot(Bot):
@@ -19,7 +27,8 @@ class Yinbot(Bot):
 
     def __init__(self, config, logger,
                  pg_utils: PostgresController,
-                 server_settings: dict, blacklist: list = []):
+                 server_settings: ServerSettings,
+                 startup: StartupTimer = None):
         """Init for bot class."""
         try:
             self.commit = f"-{subprocess.check_output(['git', 'describe', '--always']).strip().decode()}"  # noqa
@@ -29,15 +38,34 @@ class Yinbot(Bot):
         file = open('.version', 'r')
         self.version = file.read()
         self.pg_utils = pg_utils
-        self.server_settings = {}
+        self.server_settings = server_settings
         self.start_time = int(time())
         self.botcogs = [x.lower() for x in config['cogs']]
         self.credentials = config['token']
         self.guild_id = config['guild_id']
         self.bot_owner_id = config['owner_id']
         self.base_voice = config['base_voice']
+        self.log_batch_window = config.get('log_batch_window', 2.0)
+        self.log_batch_size = config.get('log_batch_size', 10)
+        self.archive_batch_size = config.get('archive_batch_size', 500)
+        self.archive_flush_ms = config.get('archive_flush_ms', 2000)
+        self.voice_role_window = config.get('voice_role_window', 1.0)
+        self.raid_role_concurrency = config.get('raid_role_concurrency', 3)
+        self.pool_max_size = \
+            (config.get('postgres_pool') or {}).get('max_size', 10)
         self.logger = logger
-        self.blchannels = blacklist
+        self.startup = startup or StartupTimer(logger)
+        self.role_index = RoleIndex()
+        self.message_gate = MessageGate(self)
+        self.message_gate.register(self.handle_commands)
+        self.reconciler = GuildReconciler(
+            self, interval=config.get('reconcile_interval', 3600))
+        self.join_pipeline = JoinPipeline(
+            self,
+            threshold=config.get('raid_join_threshold', 10),
+            window=config.get('raid_join_window', 10.0),
+            flush_interval=config.get('raid_flush_interval', 5.0)
+        )
 
         intents = discord.Intents.default()
         if config.get("prod"):
@@ -52,40 +80,49 @@ class Yinbot(Bot):
     @classmethod
     async def get_instance(cls):
         """Async method to initialize the pg_utils class."""
-        config = gila.Gila()
-        config.set_default("log_level", "INFO")
-        config.set_config_file('config/config.yml')
-        config.read_config_file()
-        config = config.all_config()
-        logger = getLogger('yinbot')
-        console_handler = StreamHandler()
-        console_handler.setFormatter(Formatter(
-            '%(asctime)s %(levelname)s %(name)s: %(message)s')
-        )
-        logger.addHandler(console_handler)
-        logger.setLevel(config.get("log_level"))
+        timer = StartupTimer()
+        with timer.phase('config'):
+            config = gila.Gila()
+            config.set_default("log_level", "INFO")
+            config.set_config_file('config/config.yml')
+            config.read_config_file()
+            config = config.all_config()
+            logger = getLogger('yinbot')
+            console_handler = StreamHandler()
+            console_handler.setFormatter(Formatter(
+                '%(asctime)s %(levelname)s %(name)s: %(message)s')
+            )
+            logger.addHandler(console_handler)
+            logger.setLevel(config.get("log_level"))
+        timer.logger = logger
         postgres_cred = config.get("postgres_credentials")
-        pg_utils = None
-        while not pg_utils:
-            try:
-                pg_utils = await PostgresController.get_instance(
-                    logger=logger, connect_kwargs=postgres_cred)
-            except Exception as e:
-                logger.critical(
-                    'Error initializing DB - trying again in 5 seconds')
-                logger.debug(f'Error: {e}')
-                sleep(5)
-        server_settings = await pg_utils.get_server_settings()
-        blchannels = await pg_utils.get_all_blacklist_channels()
-        return cls(config, logger, pg_utils, server_settings, blchannels)
+        pool_settings = config.get("postgres_pool") or {}
+        with timer.phase('database'):
+            pg_utils = await retry_with_backoff(
+                lambda: PostgresController.get_instance(
+                    logger=logger, connect_kwargs=postgres_cred,
+                    pool_settings=pool_settings),
+                logger, 'initializing DB',
+                base_delay=config.get('db_retry_base', 1.0),
+                max_delay=config.get('db_retry_max', 60.0),
+                max_attempts=config.get('db_retry_attempts', 10)
+            )
+        with timer.phase('pool warm up'):
+            warmed = await pg_utils.warm_up(
+                config.get('db_warm_connections',
+                           pool_settings.get('min_size', 10)),
+                max_size=pool_settings.get('max_size', 10),
+                timeout=config.get('db_warm_timeout', 10.0))
+            logger.info(f'{warmed} database connections ready.')
+        with timer.phase('server settings'):
+            server_settings = await pg_utils.get_server_settings()
+        return cls(config, logger, pg_utils, server_settings, timer)
 
     async def get_pre(self, bot, message):
         """Gather Prefix."""
-        try:
-            return self.server_settings[message.guild.id]['prefix']
-        except Exception as e:
-            self.logger.info(f'{e}')
-            return '-'
+        if message.guild is None:
+            return DEFAULT_PREFIX
+        return self.server_settings[message.guild.id]['prefix']
 
     def start_bot(self, cogs):
         """Actually start the bot."""
@@ -98,30 +135,69 @@ class Yinbot(Bot):
     async def on_ready(self):
         """Gather settings."""
         try:
-            self.server_settings = {}
             self.server_settings = \
                 await self.pg_utils.get_server_settings()
             self.logger.info(f'\nServers: {len(self.server_settings)}')
         except Exception as e:
             self.logger.warning(f'issue getting server settings: {e}')
+        # guilds and roles were rebuilt, no role events were sent for
+        # changes made while disconnected
+        self.role_index.clear()
+        self.reconciler.start(self.loop)
         if not hasattr(self, 'uptime'):
             self.uptime = datetime.datetime.utcnow()
+            self.startup.record('gateway', self.startup.since_last())
+            self.logger.info(self.startup.summary())
         self.logger.info(f'\nLogged in as\n{self.user.name} v{self.version}{self.commit}'  # noqa
                          f'\n{self.user.id}\n------')
 
-    async def on_message(self, ctx):
+    async def on_member_join(self, member):
+        """Hand joins to the cogs through the join pipeline."""
+        await self.join_pipeline.member_joined(member)
+
+    async def on_guild_role_create(self, role):
+        """Keep the role index current."""
+        self.role_index.role_created(role)
+
+    async def on_guild_role_update(self, before, after):
+        """Keep the role index current."""
+        self.role_index.role_updated(before, after)
+
+    async def on_guild_role_delete(self, role):
+        """Keep the role index current."""
+        self.role_index.role_deleted(role)
+
+    async def on_guild_available(self, guild):
+        """Role objects are rebuilt without role events, drop the index."""
+        self.role_index.forget(guild.id)
+
+    async def on_guild_join(self, guild):
+        """Drop any role index left from before the bot was removed."""
+        self.role_index.forget(guild.id)
+
+    async def on_guild_remove(self, guild):
+        """Drop the role index of a guild the bot left."""
+        self.role_index.forget(guild.id)
+
+    async def on_message(self, message):
         """On all messages."""
-        if ctx.author.bot:
+        await self.message_gate.dispatch(message)
+
+    async def handle_commands(self, context):
+        """Process commands for a message that passed the gate."""
+        ctx = context.message
+        if context.is_bot:
             return
-        elif isinstance(ctx.guild, type(None)):
+        elif not context.in_guild:
             return
         elif self.user in ctx.mentions:
             await ctx.channel.send(
-                embed=embeds.MentionHelpEmbed(
-                    await self.get_pre(self, ctx)
-                    )
+                embed=embeds.MentionHelpEmbed(context.prefix)
                 )
-        elif ctx.channel.id not in self.blchannels:
+        elif not context.maybe_command:
+            # can't be a command, skip all command processing
+            return
+        elif ctx.channel.id not in context.config.blacklist_channels:
             await self.process_commands(ctx)
         else:
             permis = False
@@ -1,5 +1,6 @@
 """Init file."""
 from cogs.admin import Admin
+from cogs.archive import Archive
 from cogs.filter import Filter
 from cogs.gateway import Gateway
 from cogs.help import Help
@@ -17,6 +18,7 @@ from cogs.warnings import Warnings
 
 __all__ = [
     'Admin',
+    'Archive',
     'Autoassign',
     'Filter',
     'Gateway',
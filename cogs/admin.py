@@ -55,6 +55,52 @@ class Admin(commands.Cog):
             local_embed = embeds.InternalErrorEmbed()
             ctx.send(local_embed)
 
+    @commands.group()
+    @commands.guild_only()
+    @checks.is_admin()
+    async def raid(self, ctx):
+        """Returns the join threshold that turns on batched joins."""
+        if ctx.invoked_subcommand is None:
+            threshold = self.bot.join_pipeline.threshold_for(ctx.guild.id)
+            local_embed = discord.Embed(
+                title=f'Raid threshold is {threshold} joins in '
+                f'{self.bot.join_pipeline.window:g} seconds',
+                description=' ',
+                color=0x419400
+            )
+            await ctx.send(embed=local_embed)
+
+    @raid.command(name='set')
+    async def set_raid(self, ctx, threshold: int):
+        """Set the raid join threshold for the server."""
+        if threshold < 1:
+            await ctx.send(
+                embed=embeds.CommandErrorEmbed(
+                    'Threshold must be at least 1'),
+                delete_after=3)
+            return
+        await self.store_raid_threshold(ctx, threshold)
+
+    @raid.command(name='reset')
+    async def reset_raid(self, ctx):
+        """Go back to the default raid join threshold."""
+        await self.store_raid_threshold(ctx, None)
+
+    async def store_raid_threshold(self, ctx, threshold):
+        """Save the raid threshold and report the one now in use."""
+        success = await self.bot.pg_utils.set_raid_threshold(
+            ctx.guild.id, threshold, self.bot.logger)
+        if not success:
+            await ctx.send(embed=embeds.InternalErrorEmbed())
+            return
+        threshold = self.bot.join_pipeline.threshold_for(ctx.guild.id)
+        local_embed = discord.Embed(
+            title=f'Raid threshold set to {threshold} joins',
+            description=' ',
+            color=0x419400
+        )
+        await ctx.send(embed=local_embed, delete_after=3)
+
     @commands.group()
     @commands.guild_only()
     @checks.is_admin()
@@ -194,7 +240,6 @@ class Admin(commands.Cog):
                 )
             if success:
                 added_channels.append(ctx.message.channel.name)
-                self.bot.blchannels.append(ctx.message.channel.id)
             if added_channels:
                 for channel in added_channels:
                     desc += f'{channel} \n'
@@ -229,8 +274,6 @@ class Admin(commands.Cog):
                 absent_channels.append(ctx.message.channel.name)
             if success:
                 removed_channels.append(ctx.message.channel.name)
-                if ctx.message.channel.id in self.bot.blchannels:
-                    del self.bot.blchannels[self.bot.blchannels.index(ctx.message.channel.id)]  # noqa
             if removed_channels:
                 for channel in removed_channels:
                     desc += f'{channel} \n'
@@ -0,0 +1,36 @@
+"""Archive guild messages to the database for moderation lookups."""
+from discord.ext import commands
+from .utils.archive import MessageArchiver
+
+
+class Archive(commands.Cog):
+    """Buffers every guild message and writes them to the db in bulk."""
+
+    def __init__(self, bot):
+        """Init method."""
+        super().__init__()
+        self.bot = bot
+        self.archiver = MessageArchiver(
+            bot.pg_utils,
+            bot.logger,
+            batch_size=bot.archive_batch_size,
+            flush_interval=bot.archive_flush_ms / 1000
+        )
+        self.archiver.start(bot.loop)
+        bot.message_gate.register(self.handle_message)
+
+    def cog_unload(self):
+        """Flush whatever is still buffered."""
+        self.bot.message_gate.unregister(self.handle_message)
+        self.bot.loop.create_task(self.archiver.stop())
+
+    async def handle_message(self, context):
+        """Buffer the message for archiving."""
+        if not context.in_guild:
+            return
+        self.archiver.add(context.message, self.bot.loop)
+
+
+def setup(bot):
+    """General cog loading."""
+    bot.add_cog(Archive(bot))
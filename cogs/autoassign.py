@@ -1,5 +1,6 @@
 """Handling the auto assignable roles."""
 
+import asyncio
 import discord
 from discord.ext import commands
 from .utils import checks
@@ -12,20 +13,46 @@ class Autoassign(commands.Cog):
         """Init method."""
         super().__init__()
         self.bot = bot
+        bot.join_pipeline.register(self)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
+    def cog_unload(self):
+        """Stop receiving joins."""
+        self.bot.join_pipeline.unregister(self)
+
+    async def member_joined(self, member):
         """Actually adds the autoassign roles."""
-        autoassign_roles = []
         autoassign_role_ids = await \
             self.bot.pg_utils.get_autoassign_roles(member.guild.id)
         if not autoassign_role_ids:
             return
-        for role in member.guild.roles:
-            if role.id in autoassign_role_ids:
-                autoassign_roles.append(role)
+        autoassign_roles = self.bot.role_index.resolve(
+            member.guild, autoassign_role_ids)
         await member.add_roles(*autoassign_roles)
 
+    async def members_joined(self, guild, members):
+        """Adds the autoassign roles to a batch of joins."""
+        """Roles are resolved once and only a few edits are in
+        flight at a time."""
+        autoassign_role_ids = await \
+            self.bot.pg_utils.get_autoassign_roles(guild.id)
+        if not autoassign_role_ids:
+            return
+        autoassign_roles = self.bot.role_index.resolve(
+            guild, autoassign_role_ids)
+        if not autoassign_roles:
+            return
+        semaphore = asyncio.Semaphore(self.bot.raid_role_concurrency)
+
+        async def add_roles(member):
+            async with semaphore:
+                try:
+                    await member.add_roles(*autoassign_roles)
+                except discord.HTTPException as e:
+                    self.bot.logger.warning(
+                        f'Error autoassigning roles to {member.id}: {e}')
+
+        await asyncio.gather(*[add_roles(member) for member in members])
+
     @commands.group(aliases=['aar', 'autoassign'],
                     brief='https://dashwav.github.io/yin-bot/commands/Roles/#assignable-roles')
     @commands.guild_only()
@@ -52,10 +79,7 @@ class Autoassign(commands.Cog):
     @autoassignroles.command(brief='https://dashwav.github.io/yin-bot/commands/Roles/#addremove')
     async def add(self, ctx, *, role_name):
         """Add a role to the servers auto-assignable roles list."""
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if found_role:
             if not ctx.message.author.\
                     top_role >= found_role:
@@ -93,10 +117,7 @@ class Autoassign(commands.Cog):
     @autoassignroles.command()
     async def remove(self, ctx, *, role_name):
         """Remove a role from the serves auto-assignable roles list."""
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if found_role:
             try:
                 success = await \
@@ -2,6 +2,7 @@
 import discord
 from discord.ext import commands
 from .utils import checks, embeds
+from .utils.filters import FilterEngine, validate_regex
 import re
 
 
@@ -15,6 +16,12 @@ class Filter(commands.Cog):
         """Init method."""
         super().__init__()
         self.bot = bot
+        self.engine = FilterEngine(bot)
+        bot.message_gate.register(self.handle_message)
+
+    def cog_unload(self):
+        """Stop filtering messages."""
+        self.bot.message_gate.unregister(self.handle_message)
 
     @commands.group()
     @commands.guild_only()
@@ -41,6 +48,7 @@ class Filter(commands.Cog):
             self.bot.logger.warning(f'Error setting invites allowed: {e})')
             await ctx.send(embed=local_embed)
         self.bot.server_settings[ctx.guild.id]['invites_allowed'] = True
+        self.engine.invalidate(ctx.guild.id)
         local_embed = discord.Embed(
                 title=f'Invites are now:',
                 description=f'Allowed',
@@ -60,6 +68,7 @@ class Filter(commands.Cog):
             await ctx.send(embed=local_embed)
             return
         self.bot.server_settings[ctx.guild.id]['invites_allowed'] = False
+        self.engine.invalidate(ctx.guild.id)
         local_embed = discord.Embed(
                 title=f'Invites are now:',
                 description=f'Disallowed',
@@ -67,22 +76,98 @@ class Filter(commands.Cog):
             )
         await ctx.send(embed=local_embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """General message catcher for filtering."""
+    @commands.group(aliases=['wf'])
+    @commands.guild_only()
+    @checks.has_permissions(manage_messages=True)
+    async def wordfilter(self, ctx):
+        """Manage the words and regexes that get autodeleted."""
+        if ctx.invoked_subcommand is None:
+            filter_words = await self.bot.pg_utils.get_filter_words(
+                ctx.guild.id)
+            desc = ''
+            for pattern, is_regex in filter_words.items():
+                desc += f'`{pattern}`{" (regex)" if is_regex else ""}\n'
+            local_embed = discord.Embed(
+                title=f'Filtered words:',
+                description=desc[:2048] or 'None',
+                color=0x419400
+            )
+            await ctx.send(embed=local_embed)
+
+    @wordfilter.command(name='add')
+    async def add_word(self, ctx, *, word: str):
+        """Add a word to the filter."""
+        await self.add_filter(ctx, word.strip(), False)
+
+    @wordfilter.command(name='regex')
+    async def add_regex(self, ctx, *, pattern: str):
+        """Add a regex to the filter."""
+        pattern = pattern.strip()
         try:
-            if self.bot.server_settings[message.guild.id]['invites_allowed']:
-                return
-            if message.author.guild_permissions.manage_messages:
-                return
-            regexp = re.compile(
-                r'(discord.gg\/)[a-zA-Z0-9]{0,7}|'
-                r'(discordapp.com\/invite\/)[a-zA-Z0-9]{0,7}'
+            validate_regex(pattern)
+        except re.error as e:
+            await ctx.send(
+                embed=embeds.CommandErrorEmbed(f'Invalid regex: {e}'),
+                delete_after=5)
+            return
+        await self.add_filter(ctx, pattern, True)
+
+    async def add_filter(self, ctx, pattern: str, is_regex: bool):
+        """Store a filter entry and rebuild the guild filter."""
+        success = await self.bot.pg_utils.add_filter_word(
+            ctx.guild.id, pattern, is_regex, self.bot.logger)
+        if not success:
+            await ctx.send(embed=embeds.InternalErrorEmbed())
+            return
+        self.engine.invalidate(ctx.guild.id)
+        local_embed = discord.Embed(
+            title=f'Added to filter:',
+            description=f'`{pattern}`',
+            color=0x419400
+        )
+        await ctx.send(embed=local_embed)
+
+    @wordfilter.command(name='remove', aliases=['rem'])
+    async def remove_word(self, ctx, *, pattern: str):
+        """Remove a word or regex from the filter."""
+        try:
+            success = await self.bot.pg_utils.rem_filter_word(
+                ctx.guild.id, pattern.strip(), self.bot.logger)
+        except ValueError:
+            local_embed = discord.Embed(
+                title=f'Not in filter:',
+                description=f'`{pattern}`',
+                color=0x651111
             )
-            if bool(regexp.search(message.content)):
-                await message.delete()
-        except AttributeError:
-            pass
+            await ctx.send(embed=local_embed)
+            return
+        if not success:
+            await ctx.send(embed=embeds.InternalErrorEmbed())
+            return
+        self.engine.invalidate(ctx.guild.id)
+        local_embed = discord.Embed(
+            title=f'Removed from filter:',
+            description=f'`{pattern}`',
+            color=0x419400
+        )
+        await ctx.send(embed=local_embed)
+
+    async def handle_message(self, context):
+        """General message catcher for filtering."""
+        """Checks run cheapest first, permissions are only resolved
+        for messages that actually matched a filter."""
+        message = context.message
+        if not context.in_guild or not message.content:
+            return
+        guild_filter = self.engine.get(message.guild.id)
+        if not guild_filter.active:
+            return
+        if not guild_filter.matches(message.content):
+            return
+        permissions = context.permissions
+        if permissions is None or permissions.manage_messages:
+            return
+        await message.delete()
 
 
 def setup(bot):
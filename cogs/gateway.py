@@ -3,6 +3,46 @@
 import discord
 from discord.ext import commands
 from .utils import checks
+from .utils.delivery import ChannelDispatcher
+from .utils.templates import compile_template
+
+MESSAGE_LIMIT = 2000
+
+
+class BatchMember():
+    """
+    Stands in for a member when rendering one welcome for many joins
+    """
+    __slots__ = ('guild', 'mention', 'name')
+
+    def __init__(self, guild, members):
+        self.guild = guild
+        self.mention = ', '.join(member.mention for member in members)
+        self.name = ', '.join(member.name for member in members)
+
+
+def welcome_batches(template, guild, members):
+    """
+    Yields one rendered welcome per group of members, each group as large
+    as fits in a message so no mention is cut and no member is dropped.
+    Only a single member whose own welcome is too long gets truncated
+    :param template: the compiled welcome message
+    :param guild: the guild the members joined
+    :param members: the members to welcome
+    """
+    batch = []
+    rendered = ''
+    for member in members:
+        candidate = template.render(BatchMember(guild, batch + [member]))
+        if batch and len(candidate) > MESSAGE_LIMIT:
+            yield rendered[:MESSAGE_LIMIT]
+            batch = [member]
+            rendered = template.render(BatchMember(guild, batch))
+        else:
+            batch.append(member)
+            rendered = candidate
+    if batch:
+        yield rendered[:MESSAGE_LIMIT]
 
 
 class Gateway(commands.Cog):
@@ -12,21 +52,33 @@ class Gateway(commands.Cog):
         """Init method."""
         super().__init__()
         self.bot = bot
+        self.dispatcher = ChannelDispatcher(bot)
+        bot.join_pipeline.register(self)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
+    def cog_unload(self):
+        """Stop receiving joins."""
+        self.bot.join_pipeline.unregister(self)
+
+    async def member_joined(self, member):
         """Actually handles printing the welcome message."""
-        welcome_channels = await \
-            self.bot.pg_utils.get_welcome_channels(
-                member.guild.id, self.bot.logger)
-        welcome_message = await \
-            self.bot.pg_utils.get_welcome_message(
-                member.guild.id, self.bot.logger)
-        for ch_id in welcome_channels:
-            channel = self.bot.get_channel(ch_id)
-            await channel.send(welcome_message.replace(
-                f'%user%', member.mention).replace(
-                f'%server%', member.guild.name))
+        config = self.bot.pg_utils.cache.get(member.guild.id)
+        if not config.welcome_channels or not config.welcome_message:
+            return
+        template = compile_template(config.welcome_message)
+        await self.dispatcher.send(
+            config.welcome_channels, 'welcome message',
+            content=template.render(member))
+
+    async def members_joined(self, guild, members):
+        """Welcomes a batch of joins with one message per chunk."""
+        config = self.bot.pg_utils.cache.get(guild.id)
+        if not config.welcome_channels or not config.welcome_message:
+            return
+        template = compile_template(config.welcome_message)
+        for content in welcome_batches(template, guild, members):
+            await self.dispatcher.send(
+                config.welcome_channels, 'batched welcome message',
+                content=content)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
@@ -39,13 +91,10 @@ class Gateway(commands.Cog):
                 self.bot.pg_utils.get_role_greetings(
                     role.id, self.bot.logger)
             for role_greet in role_greetings:
-                channel = self.bot.get_channel(role_greet["channel_id"])
-                if not channel:
-                    self.bot.logger.error("Channel removed")
-                    continue
-                await channel.send(role_greet['greeting'].replace(
-                    f'%user%', after.mention).replace(
-                    f'%server%', after.guild.name))
+                template = compile_template(role_greet['greeting'])
+                await self.dispatcher.send_one(
+                    role_greet['channel_id'], 'role greeting',
+                    content=template.render(after))
 
     @commands.group()
     @commands.guild_only()
@@ -82,9 +131,7 @@ class Gateway(commands.Cog):
             self.bot.logger
         )
         if success:
-            desc = welcome_string.replace(
-                f'%user%', ctx.message.author.mention).replace(
-                f'%server%', ctx.guild.name)
+            desc = compile_template(welcome_string).render(ctx.author)
             local_embed = discord.Embed(
                 title=f'Welcome message set:',
                 description=f'**Preview:**\n{desc} ',
@@ -198,9 +245,7 @@ class Gateway(commands.Cog):
             self.bot.logger
         )
         if success:
-            desc = welcome_string.replace(
-                f'%user%', ctx.message.author.mention).replace(
-                f'%server%', ctx.guild.name)
+            desc = compile_template(welcome_string).render(ctx.author)
             local_embed = discord.Embed(
                 title=f'Role greeting message set:',
                 description=f'**Preview:**\n{desc} ',
@@ -2,6 +2,7 @@
 import discord
 from discord.ext import commands
 from .utils import checks, embeds
+from .utils.delivery import ChannelDispatcher, LogBatcher
 
 
 class Logging(commands.Cog):
@@ -12,54 +13,76 @@ class Logging(commands.Cog):
         super().__init__()
         self.bot = bot
         self.logger = bot.logger
+        self.dispatcher = ChannelDispatcher(bot)
+        self.batcher = LogBatcher(
+            self.dispatcher,
+            flush_window=bot.log_batch_window,
+            max_batch=bot.log_batch_size
+        )
+        bot.join_pipeline.register(self)
+
+    def cog_unload(self):
+        """Send anything still waiting in the log batcher."""
+        self.bot.join_pipeline.unregister(self)
+        self.bot.loop.create_task(self.batcher.close())
 
-    @commands.group(hidden=True, aliases=['ldbc', 'get_these_errors_outta_here'])  # noqa
+    @commands.command(hidden=True, aliases=['ldbc', 'get_these_errors_outta_here'])  # noqa
     @commands.is_owner()
     async def log_db_cleaning(self, ctx):
-        """Clean a deleted channel from the voice log and server log databases."""  # noqa
+        """Remove every deleted channel from the channel databases."""
         embed_title = f'Database Cleaning Tool'
-        if ctx.subcommand_passed is None:
-            local_embed = discord.Embed(
-                title=embed_title,
-                description="""Check the console for channel
-                     errors and pass them as so:\n
-                    ldbc *channel snowflake id*""",
-                color=0xCCCCCC
-            )
-            await ctx.send(embed=local_embed)
-            return
-        remove_id = ctx.subcommand_passed
-        was_log_removed = False
-        was_voice_removed = False
-        for guild in self.bot.guilds:
-            log_channel = await self.bot.pg_utils.get_logger_channels(guild.id)
-            voice_channel = await self.bot.pg_utils.get_voice_channels(guild.id)  # noqa
-            for remove_id in log_channel:
-                await self.bot.pg_utils.rem_logger_channel(
-                    guild.id, remove_id, self.bot.logger
-                )
-                was_log_removed = True
-            for remove_id in voice_channel:
-                await self.bot.pg_utils.rem_voice_channel(
-                    guild.id, remove_id, self.bot.logger
-                )
-                was_voice_removed = True
-        if was_log_removed or was_voice_removed:
-            local_embed = discord.Embed(
-                title=embed_title,
-                description=f'Channel was removed from database',
-                color=0x419400
-            )
-            await ctx.send(embed=local_embed)
+        try:
+            removed = await self.reconcile_channels()
+        except Exception as e:
+            self.bot.logger.warning(f'Error cleaning channel databases: {e}')
+            await ctx.send(embed=embeds.InternalErrorEmbed())
             return
+        desc = ''
+        for table, count in removed.items():
+            if count:
+                desc += f'{table}: {count}\n'
         local_embed = discord.Embed(
             title=embed_title,
-            description="""Channel not found in database,
-                or you did not give a valid channel id""",
-            color=0x651111
-            )
+            description=f'Removed deleted channels:\n{desc}'
+                        if desc else 'No deleted channels found',
+            color=0x419400
+        )
         await ctx.send(embed=local_embed)
 
+    async def reconcile_channels(self):
+        """
+        Diffs the channel tables against the channels the gateway knows
+        about and removes the ones that are gone, one query per table.
+        Unavailable guilds are skipped so an outage doesn't wipe them.
+        """
+        guild_ids = []
+        live_channel_ids = []
+        for guild in self.bot.guilds:
+            if guild.unavailable:
+                continue
+            guild_ids.append(guild.id)
+            live_channel_ids.extend(channel.id for channel in guild.channels)
+        removed = await self.bot.pg_utils.remove_dangling_channels(
+            guild_ids, live_channel_ids)
+        self.sync_server_settings(guild_ids)
+        self.bot.logger.info(
+            f'Removed {sum(removed.values())} deleted channel rows')
+        return removed
+
+    def sync_server_settings(self, guild_ids):
+        """
+        Copies the logging and modlog flags back from the config cache
+        after channel cleanup may have turned them off
+        """
+        cache = self.bot.pg_utils.cache
+        for guild_id in guild_ids:
+            config = cache.guilds.get(guild_id)
+            settings = self.bot.server_settings.get(guild_id)
+            if config is None or settings is None:
+                continue
+            settings['modlog_enabled'] = config.modlog_enabled
+            settings['logging_enabled'] = config.logging_enabled
+
     @commands.group()
     @commands.guild_only()
     @checks.is_admin()
@@ -301,33 +324,26 @@ class Logging(commands.Cog):
         channels = await self.bot.pg_utils.get_logger_channels(
             guild.id)
         local_embed = embeds.LogBanEmbed(user)
-        for channel in channels:
-            try:
-                ch = self.bot.get_channel(channel)
-                await ch.send(embed=local_embed)
-            except Exception as e:
-                self.bot.logger.info(
-                    f'Error logging user ban in channel {channel}'
-                    f', error: {e}'
-                )
+        await self.dispatcher.send(
+            channels, 'user ban', embed=local_embed)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
+    async def member_joined(self, member):
         """Send a message on a user join."""
         if not self.bot.server_settings[member.guild.id]['logging_enabled']:
             return
         channels = await self.bot.pg_utils.get_logger_channels(
             member.guild.id)
         local_embed = embeds.JoinEmbed(member)
-        for channel in channels:
-            try:
-                ch = self.bot.get_channel(channel)
-                await ch.send(embed=local_embed)
-            except Exception as e:
-                self.bot.logger.info(
-                    f'Error logging user join in channel {channel}'
-                    f', error: {e}'
-                )
+        self.batcher.queue(channels, local_embed)
+
+    async def members_joined(self, guild, members):
+        """Send one summary for a batch of joins."""
+        if not self.bot.server_settings[guild.id]['logging_enabled']:
+            return
+        channels = await self.bot.pg_utils.get_logger_channels(guild.id)
+        local_embed = embeds.JoinSpikeEmbed(members)
+        await self.dispatcher.send(
+            channels, 'join spike', embed=local_embed)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
@@ -337,15 +353,7 @@ class Logging(commands.Cog):
         channels = await self.bot.pg_utils.get_logger_channels(
             member.guild.id)
         local_embed = embeds.LeaveEmbed(member)
-        for channel in channels:
-            try:
-                ch = self.bot.get_channel(channel)
-                await ch.send(embed=local_embed)
-            except Exception as e:
-                self.bot.logger.info(
-                    f'Error logging user leave in channel {channel}'
-                    f', error: {e}'
-                )
+        self.batcher.queue(channels, local_embed)
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
@@ -364,20 +372,14 @@ class Logging(commands.Cog):
                     before.content,
                     after.content
                 )
-                try:
-                    for channel in channels:
-                        ch = self.bot.get_channel(channel)
-                        await ch.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.warning(
-                        f'Issue logging message edit in channel {channel}'
-                        f', error: {e}'
-                    )
             except Exception as e:
                 self.bot.logger.warning(
-                    f'Issue making embed for channel {channel}'
+                    f'Issue making message edit embed'
                     f', error: {e}'
                 )
+                return
+            await self.dispatcher.send(
+                channels, 'message edit', embed=local_embed)
         except AttributeError:
             pass
 
@@ -396,20 +398,14 @@ class Logging(commands.Cog):
                 message.channel.name,
                 message.content,
             )
-            try:
-                for channel in channels:
-                    ch = self.bot.get_channel(channel)
-                    await ch.send(embed=local_embed)
-            except Exception as e:
-                self.bot.logger.warning(
-                    f'Issue logging message delete in channel {channel}'
-                    f', error: {e}'
-                )
         except Exception as e:
             self.bot.logger.warning(
-                f'Issue making embed for channel {channel}'
+                f'Issue making message delete embed'
                 f', error: {e}'
             )
+            return
+        await self.dispatcher.send(
+            channels, 'message delete', embed=local_embed)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
@@ -426,30 +422,14 @@ class Logging(commands.Cog):
                 after,
                 role.name
             )
-            for channel in channels:
-                try:
-                    ch = self.bot.get_channel(channel)
-                    await ch.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.info(
-                        f'Error logging role change'
-                        f' in channel {channel}, error: {e}'
-                    )
+            self.batcher.queue(channels, local_embed)
         role_diff = set(before.roles) - (set(after.roles))
         for role in role_diff:
             local_embed = embeds.RoleRemoveEmbed(
                 after,
                 role.name
             )
-            for channel in channels:
-                try:
-                    ch = self.bot.get_channel(channel)
-                    await ch.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.info(
-                        f'Error logging role remove in'
-                        f' channel {channel}, error: {e}'
-                    )
+            self.batcher.queue(channels, local_embed)
 
     @commands.Cog.listener()
     async def on_user_update(self, before, after):
@@ -467,15 +447,8 @@ class Logging(commands.Cog):
                     guild_id))
         local_embed = embeds.UsernameUpdateEmbed(
             after, before.name, after.name)
-        for channel in extended_channels:
-            try:
-                ch = self.bot.get_channel(channel)
-                await ch.send(embed=local_embed)
-            except Exception as e:
-                self.bot.logger.info(
-                    f'Error logging name change'
-                    f' in channel {channel}, error {e}'
-                )
+        await self.dispatcher.send(
+            extended_channels, 'name change', embed=local_embed)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -491,95 +464,44 @@ class Logging(commands.Cog):
             local_embed = embeds.VoiceChannelStateEmbed(
                 member, after.channel, 'joined'
             )
-            for channel in vc_channels:
-                try:
-                    channel = self.bot.get_channel(channel)
-                    await channel.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.info(
-                        f'Error logging voice join in'
-                        f' channel {channel}, error: {e}'
-                    )
+            await self.dispatcher.send(
+                vc_channels, 'voice join', embed=local_embed)
         elif after.channel is None and before.channel:
             local_embed = embeds.VoiceChannelStateEmbed(
                 member, before.channel, 'left'
             )
-            for channel in vc_channels:
-                try:
-                    channel = self.bot.get_channel(channel)
-                    await channel.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.info(
-                        f'Error logging voice leave in'
-                        f' channel {channel}, error: {e}'
-                    )
+            await self.dispatcher.send(
+                vc_channels, 'voice leave', embed=local_embed)
         elif before.channel != after.channel:
             local_embed = embeds.VoiceChannelMoveEmbed(
                 member, before.channel, after.channel
             )
-            for channel in vc_channels:
-                try:
-                    channel = self.bot.get_channel(channel)
-                    await channel.send(embed=local_embed)
-                except Exception as e:
-                    self.bot.logger.info(
-                        f'Error logging voice move in'
-                        f' channel {channel}, error: {e}'
-                    )
+            await self.dispatcher.send(
+                vc_channels, 'voice move', embed=local_embed)
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
-        """Attempt to remove deleted channel from the logging databases."""
-        logger = await self.bot.pg_utils.get_logger_channels(channel.guild.id)
-        vlogger = await self.bot.pg_utils.get_voice_channels(channel.guild.id)
-        self.bot.logger.info(channel.id)
-        self.bot.logger.info(logger)
-        self.bot.logger.info(vlogger)
-        channel_type = -1
-        if channel.id in logger and channel.id in vlogger:
-            channel_type = 0
-        elif channel.id in logger:
-            channel_type = 1
-        elif channel.id in vlogger:
-            channel_type = 2  # noqa
-        else:
+        """Remove a deleted channel from every channel database."""
+        self.dispatcher.forget(channel.id)
+        cache = self.bot.pg_utils.cache
+        if channel.guild.id in cache and \
+                not cache.get(channel.guild.id).uses_channel(channel.id):
             return
-        server_del = channel.guild.id
-        if (channel_type % 2) <= 1:
-            try:
-                success = False
-                success = await \
-                    self.bot.pg_utils.rem_logger_channel(
-                        server_del, channel, self.bot.logger
-                    )
-                if success:
-                    self.bot.logger.info(
-                        f'Channel deleted from server {server_del}'
-                        f', removed from log db'
-                    )
-            except Exception as e:
-                self.bot.logger.info(
-                    f"""Issue removing channel {channel} from log database
-                    after deletion error: {e}"""
-                )
-        if (channel_type % 2) == 0:
-            try:
-                success = False
-                success = await \
-                    self.bot.pg_utils.rem_voice_channel(
-                        server_del, channel, self.bot.logger
-                    )
-                if success:
-                    self.bot.logger.info(
-                        f'Channel deleted from server {server_del}'
-                        f', removed from voice log db'
-                    )
-            except Exception as e:
-                self.bot.logger.info(
-                    f"""Issue removing channel {channel} from voice database
-                    after deletion error: {e}"""
-                )
-
+        try:
+            removed = await self.bot.pg_utils.remove_channels([channel.id])
+        except Exception as e:
+            self.bot.logger.info(
+                f'Issue removing channel {channel.id} from the databases'
+                f' after deletion error: {e}'
+            )
+            return
+        self.sync_server_settings([channel.guild.id])
+        tables = [table for table, count in removed.items() if count]
+        if tables:
+            self.bot.logger.info(
+                f'Channel deleted from server {channel.guild.id}'
+                f', removed from {", ".join(tables)}'
+            )
 
 def setup(bot):
     """General cog loading."""
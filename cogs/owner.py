@@ -4,7 +4,8 @@ import traceback
 import yappi
 import discord
 from discord.ext import commands
-from .utils import helpers
+from .utils import embeds
+from .utils.db_utils import guild_settings
 
 
 class Owner(commands.Cog):
@@ -41,10 +42,8 @@ class Owner(commands.Cog):
         """Add a server to the db."""
         try:
             await self.bot.pg_utils.add_server(ctx.guild.id)
-            self.bot.server_settings[ctx.guild.id] = {
-                'prefix': '-',
-                'modlog_enabled': False
-            }
+            self.bot.server_settings[ctx.guild.id] = guild_settings(
+                self.bot.pg_utils.cache.get(ctx.guild.id))
             await ctx.send('\N{OK HAND SIGN}', delete_after=3)
             await ctx.message.delete()
         except Exception as e:
@@ -55,48 +54,25 @@ class Owner(commands.Cog):
     @commands.is_owner()
     async def auto_fix_servers(self, ctx, *, test: str = None):
         """Fix servers that are not in the database."""
-        wrong_guilds = []
-        for server in self.bot.guilds:
-            try:
-                server_settings = await self.bot.pg_utils.get_server(
-                    server.id, self.bot.logger
-                )
-            except Exception as e:
-                self.bot.logger.warning(f'Issues getting servers: {e}')
-                await ctx.send('❌', delete_after=3)
-            if not server_settings:
-                wrong_guilds.append(server)
-        if test:
-            local_embed = discord.Embed(
-                name='Discord Server Check',
-                value=f'There are {len(wrong_guilds)} that are not '
-                      'correctly represented in the database'
-            )
-            current_s = '----\n'
-            wrong_s = '----\n'
-            for key, server_s in self.bot.server_settings.items():
-                current_s += f'{key}\n'
-            for server in wrong_guilds:
-                wrong_s += f'{server.id}\n'
-            local_embed.add_field(name='current_servers', value=current_s)
-            local_embed.add_field(name='wrong_servers', value=wrong_s)
-            await ctx.send(embed=local_embed)
+        try:
+            missing, added, duration = \
+                await self.bot.reconciler.reconcile(dry_run=bool(test))
+        except Exception as e:
+            self.bot.logger.warning(f'Error reconciling servers: {e}')
+            await ctx.send('❌', delete_after=3)
             return
-        confirm = await helpers.custom_confirm(
-            ctx,
-            f'```This will edit {len(wrong_guilds)} in the database.'
-            f'This is an irreversable action, are you sure?```'
+        local_embed = discord.Embed(
+            title='Discord Server Check',
+            description=f'There are {len(missing)} servers that are not '
+                        'correctly represented in the database\n'
+                        f'Added {added} in {duration * 1000:.0f}ms'
         )
-        if not confirm:
-            return
-        for server in wrong_guilds:
-            try:
-                await self.bot.pg_utils.add_server(server.id)
-            except Exception as e:
-                self.bot.logger.warning(f'Error adding server to db: {e}')
-                await ctx.send('❌', delete_after=3)
-                return
-        await ctx.send('\N{OK HAND SIGN}', delete_after=3)
+        if test and missing:
+            wrong_s = '----\n'
+            for guild_id in missing:
+                wrong_s += f'{guild_id}\n'
+            local_embed.add_field(name='wrong_servers', value=wrong_s[:1024])
+        await ctx.send(embed=local_embed)
 
     @commands.command(hidden=True)
     @commands.is_owner()
@@ -124,6 +100,19 @@ class Owner(commands.Cog):
         except Exception as e:
             await ctx.send(f"Error doing that: {e}")
 
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def dbstats(self, ctx, *, reset: str = None):
+        """Show database pool metrics."""
+        """
+        :params reset: anything to start counting from zero again
+        """
+        metrics = self.bot.pg_utils.metrics
+        await ctx.send(embed=embeds.PoolStatsEmbed(
+            metrics, self.bot.pool_max_size))
+        if reset:
+            metrics.reset()
+
     @commands.command(hidden=True)
     @commands.is_owner()
     async def load(self, ctx, *, module):
@@ -1,6 +1,5 @@
 """Ping an unpingable role."""
 from discord.ext import commands
-from discord.utils import find
 from .utils import checks, embeds
 
 
@@ -24,11 +23,11 @@ class Pings(commands.Cog):
               delete_after=3)
             await ctx.message.delete()
             return
-        guild_roles = ctx.guild.roles
         found_roles = []
         for role in roles:
-            guild_role = find(
-              lambda m: m.name.lower() == role.lower(), guild_roles)
+            # first match in guild.roles, as discord.utils.find gave
+            guild_role = self.bot.role_index.find(
+                ctx.guild, role, highest=False)
             if not guild_role:
                 continue
             found_roles.append(guild_role)
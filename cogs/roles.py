@@ -18,10 +18,7 @@ class Roles(commands.Cog):
     @checks.has_permissions(manage_roles=True)
     async def cleanrole(self, ctx, *, role_name):
         """(Testing) Removes all members from a certain role."""
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if not found_role:
             await ctx.send(embed=discord.Embed(
                 title='Couldn\'t find role',
@@ -49,19 +46,15 @@ class Roles(commands.Cog):
     @commands.guild_only()
     async def iam(self, ctx, *, role_name):
         """Add self-assignable role to user."""
-        found_role = None
         users_roles = ctx.message.author.roles.copy()
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if found_role:
-            for role in users_roles:
-                if role == found_role:
-                    local_embed = embeds.RoleDuplicateUserEmbed(
-                        ctx.message.author, found_role.name
-                    )
-                    await ctx.send(embed=local_embed, delete_after=5)
-                    return
+            if found_role in users_roles:
+                local_embed = embeds.RoleDuplicateUserEmbed(
+                    ctx.message.author, found_role.name
+                )
+                await ctx.send(embed=local_embed, delete_after=5)
+                return
             assignable = await self.bot.pg_utils.is_role_assignable(
                 ctx.guild.id, found_role.id)
             if assignable:
@@ -90,17 +83,11 @@ class Roles(commands.Cog):
     @commands.guild_only()
     async def iamnot(self, ctx, *, role_name):
         """Remove self-assignable role from user."""
-        found_role = None
         users_roles = ctx.message.author.roles.copy()
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role1 = role
-        if not found_role1:
-            return
-        for role in users_roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if not found_role:
+            return
+        if found_role not in users_roles:
             local_embed = embeds.RoleNotRemovedEmbed(
                 ctx.message.author, role_name
             )
@@ -148,10 +135,7 @@ class Roles(commands.Cog):
     @assignableroles.command()
     async def add(self, ctx, *, role_name):
         """Add a role to the server's self-assignable roles list."""
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if found_role:
             if not ctx.message.author.\
                     top_role >= found_role:
@@ -189,10 +173,7 @@ class Roles(commands.Cog):
     @assignableroles.command()
     async def remove(self, ctx, *, role_name):
         """Remove a role from the server's self-assignable roles list."""
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if found_role:
             try:
                 success = await \
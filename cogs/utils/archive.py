@@ -0,0 +1,77 @@
+"""
+Buffered writer for the message archive.
+Messages are collected in memory and copied into postgres in bulk,
+either once `batch_size` rows are waiting or every `flush_interval`
+seconds, so archiving doesn't cost a db round-trip per message.
+"""
+import asyncio
+
+from .db_utils import message_record
+
+
+class MessageArchiver():
+    """
+    Batches messages and flushes them with COPY
+    If a flush fails the rows are kept for the next one, up to
+    `max_buffer` rows, after which the oldest are dropped
+    """
+    __slots__ = ('pg_utils', 'logger', 'batch_size', 'flush_interval',
+                 'max_buffer', 'buffer', 'lock', 'task')
+
+    def __init__(self, pg_utils, logger, batch_size: int = 500,
+                 flush_interval: float = 2.0):
+        self.pg_utils = pg_utils
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = batch_size * 20
+        self.buffer = []
+        self.lock = asyncio.Lock()
+        self.task = None
+
+    def start(self, loop):
+        """
+        Starts the periodic flush task
+        :param loop: the event loop to run on
+        """
+        if self.task is None:
+            self.task = loop.create_task(self.run())
+
+    async def stop(self):
+        """
+        Stops the periodic flush and writes out anything still buffered
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def add(self, message, loop):
+        """
+        Buffers a message, kicking off a flush once the batch is full
+        :param message: the discord message object
+        :param loop: the event loop to schedule the flush on
+        """
+        self.buffer.append(message_record(message))
+        if len(self.buffer) >= self.batch_size and not self.lock.locked():
+            loop.create_task(self.flush())
+
+    async def flush(self):
+        """
+        Copies everything buffered into the archive
+        """
+        async with self.lock:
+            if not self.buffer:
+                return
+            records, self.buffer = self.buffer, []
+            try:
+                await self.pg_utils.add_messages(records)
+            except Exception as e:
+                self.logger.warning(
+                    f'Error archiving {len(records)} messages: {e}')
+                self.buffer = (records + self.buffer)[-self.max_buffer:]
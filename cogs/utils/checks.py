@@ -90,13 +90,8 @@ def is_in_guilds(*guild_ids):
 
 
 async def is_channel_blacklisted(self, ctx):
-    blacklist_channels = await self.pg_utils.get_blacklist_channels(
-        ctx.guild.id)
-    if not blacklist_channels:
-        return False
-    if ctx.channel.id in blacklist_channels:
-        return True
-    return False
+    return ctx.channel.id in \
+        self.pg_utils.cache.get(ctx.guild.id).blacklist_channels
 
 
 def is_lounge_cpp():
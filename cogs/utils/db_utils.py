@@ -10,14 +10,20 @@ design.
 """
 from typing import Optional
 from .enums import Action
+from .migrations import migrate
+from .queries import HISTORY_TABLES, QueryRegistry
+import asyncio
 import datetime
 
 try:
-    from asyncpg import Record, InterfaceError, create_pool
+    from asyncpg import (
+        Record, InterfaceError, UniqueViolationError, create_pool
+    )
     from asyncpg.pool import Pool
 except ImportError:
     Record = None
     Pool = None
+    UniqueViolationError = None
     print('asyncpg not installed, PostgresSQL function not available.')
 
 
@@ -33,186 +39,338 @@ def parse_record(record: Record) -> Optional[tuple]:
         return None
 
 
-async def make_tables(pool: Pool, schema: str):
+def pool_options(settings: dict) -> dict:
     """
-    Make tables used for caching if they don't exist.
-    :param pool: the connection pool.
-    :param schema: the schema name.
+    Turns the postgres_pool config section into create_pool arguments
+    statement_timeout is in milliseconds and set on every connection
+    :param settings: the postgres_pool config section
+    :return: keyword arguments for create_pool
     """
-    await pool.execute('CREATE SCHEMA IF NOT EXISTS {};'.format(schema))
-
+    options = {key: settings[key] for key in POOL_SETTINGS if key in settings}
+    if settings.get('statement_timeout'):
+        options['server_settings'] = {
+            'statement_timeout': str(int(settings['statement_timeout']))
+        }
+    return options
+
+
+# Attempts at allocating a moderation/warning index before giving up,
+# only concurrent inserts for the same user can collide
+INDEX_RETRIES = 3
+
+# Every table that stores channel ids, the column holding the id and the
+# GuildConfig set it is cached in (None if not a plain set)
+CHANNEL_TABLES = (
+    ('modlog_channels', 'channel_id', 'modlog_channels'),
+    ('logging_channels', 'channel_id', 'logging_channels'),
+    ('voice_logging', 'channel_id', 'voice_channels'),
+    ('welcome_channels', 'channel_id', 'welcome_channels'),
+    ('blacklist_channels', 'channel_id', None),
+    ('voice_roles', 'channel_id', None),
+    ('role_greetings', 'channel_id', None),
+    ('slowmode', 'channelid', 'slowmode_channels'),
+)
+
+# GuildConfig channel set -> servers flag turned off once it is empty
+CHANNEL_FLAGS = {
+    'modlog_channels': 'modlog_enabled',
+    'logging_channels': 'logging_enabled',
+    'voice_channels': 'voice_logging',
+}
+
+# Keys of the postgres_pool config section passed straight to create_pool
+POOL_SETTINGS = (
+    'min_size', 'max_size', 'max_queries', 'max_inactive_connection_lifetime'
+)
+
+MESSAGE_COLUMNS = (
+    'serverid', 'messageid', 'authorid', 'channelid',
+    'bot', 'pinned', 'content', 'createdat'
+)
+
+
+def message_record(message) -> tuple:
     """
-    #################################################################################
-    This section is to be used for creating tables meant for server info and settings
-    #################################################################################
+    Builds a messages row from a discord message
+    :param message: the discord message object
+    :return: values in the order of MESSAGE_COLUMNS
     """
-
-    servers = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.servers (
-      serverid BIGINT,
-      prefix varchar(2),
-      voice_enabled boolean DEFAULT FALSE,
-      invites_allowed boolean DEFAULT TRUE,
-      voice_logging boolean DEFAULT FALSE,
-      modlog_enabled boolean DEFAULT FALSE,
-      welcome_message text,
-      logging_enabled boolean DEFAULT FALSE,
-      ban_footer text,
-      kick_footer text,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (serverid)
-    );"""
-
-    voice_roles = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.voice_roles (
-      serverid BIGINT references {schema}.servers(serverid),
-      role_id BIGINT,
-      channel_id BIGINT,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (role_id, channel_id)
-    );
+    return (
+        message.guild.id,
+        message.id,
+        message.author.id,
+        message.channel.id,
+        message.author.bot,
+        message.pinned,
+        message.clean_content,
+        message.created_at
+    )
+
+
+class GuildConfig():
     """
-
-    voice_logging = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.voice_logging (
-      serverid BIGINT references {schema}.servers(serverid),
-      channel_id BIGINT,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );
+    In-memory copy of every settings row a guild has in the db
+    Defaults mirror the values `add_server` inserts for a new guild
     """
+    __slots__ = (
+        'prefix', 'voice_enabled', 'invites_allowed', 'voice_logging',
+        'modlog_enabled', 'logging_enabled', 'welcome_message',
+        'ban_footer', 'kick_footer', 'modlog_channels', 'logging_channels',
+        'voice_channels', 'welcome_channels', 'blacklist_channels',
+        'slowmode_channels', 'autoassign_roles', 'assignable_roles',
+        'voice_roles', 'voice_role_ids', 'role_greetings', 'filter_words',
+        'raid_join_threshold'
+    )
+
+    def __init__(self):
+        self.prefix = '-'
+        self.voice_enabled = False
+        self.invites_allowed = True
+        self.voice_logging = False
+        self.modlog_enabled = False
+        self.logging_enabled = False
+        self.welcome_message = 'Welcome %user%!'
+        self.ban_footer = 'This is an automated message'
+        self.kick_footer = 'This is an automated message'
+        self.modlog_channels = set()
+        self.logging_channels = set()
+        self.voice_channels = set()
+        self.welcome_channels = set()
+        # replaced rather than mutated so readers always see a whole set
+        self.blacklist_channels = frozenset()
+        self.slowmode_channels = set()
+        self.autoassign_roles = set()
+        self.assignable_roles = set()
+        # channel_id -> set of role ids given while in that channel
+        self.voice_roles = {}
+        # every role in voice_roles, None until all_voice_roles is called
+        self.voice_role_ids = None
+        # channel_id -> role greeting row (one greeting per channel)
+        self.role_greetings = {}
+        # filtered word or regex -> whether it is a regex
+        self.filter_words = {}
+        # None uses the raid_join_threshold from the config
+        self.raid_join_threshold = None
 
-    modlog_channels = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.modlog_channels (
-      serverid BIGINT references {schema}.servers(serverid),
-      channel_id bigint,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );"""
-
-    welcome_channels = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.welcome_channels (
-      serverid BIGINT references {schema}.servers(serverid), 
-      channel_id BIGINT,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );"""
-
-    logging_channels = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.logging_channels (
-      serverid BIGINT references {schema}.servers(serverid),
-      channel_id bigint,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );"""
-
-    assignableroles = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.assignable_roles (
-      serverid BIGINT references {schema}.servers(serverid),
-      role_id bigint,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (role_id)
-    );"""
-
-    blacklist_channels = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.blacklist_channels (
-      serverid BIGINT references {schema}.servers(serverid),
-      channel_id bigint,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );"""
-
-    role_greetings = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.role_greetings (
-      serverid BIGINT references {schema}.servers(serverid),
-      channel_id bigint,
-      role_id bigint,
-      greeting TEXT,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (channel_id)
-    );
+    @classmethod
+    def from_record(cls, row):
+        """
+        Builds a config from a row of `PostgresController.get_guild_configs`
+        :param row: servers columns plus one aggregated array per table
+        """
+        config = cls()
+        config.prefix = row['prefix']
+        config.voice_enabled = row['voice_enabled']
+        config.invites_allowed = row['invites_allowed']
+        config.voice_logging = row['voice_logging']
+        config.modlog_enabled = row['modlog_enabled']
+        config.logging_enabled = row['logging_enabled']
+        config.welcome_message = row['welcome_message']
+        config.ban_footer = row['ban_footer']
+        config.kick_footer = row['kick_footer']
+        config.raid_join_threshold = row['raid_join_threshold']
+        config.modlog_channels = set(row['modlog_channels'] or ())
+        config.logging_channels = set(row['logging_channels'] or ())
+        config.voice_channels = set(row['voice_channels'] or ())
+        config.welcome_channels = set(row['welcome_channels'] or ())
+        config.blacklist_channels = frozenset(
+            row['blacklist_channels'] or ())
+        config.slowmode_channels = set(row['slowmode_channels'] or ())
+        config.autoassign_roles = set(row['autoassign_roles'] or ())
+        config.assignable_roles = set(row['assignable_roles'] or ())
+        for channel_id, role_id in zip(row['voice_role_channels'] or (),
+                                       row['voice_role_roles'] or ()):
+            config.voice_roles.setdefault(channel_id, set()).add(role_id)
+        for channel_id, role_id, greeting in zip(
+                row['greeting_channels'] or (),
+                row['greeting_roles'] or (),
+                row['greeting_messages'] or ()):
+            config.role_greetings[channel_id] = {
+                'serverid': row['serverid'],
+                'channel_id': channel_id,
+                'role_id': role_id,
+                'greeting': greeting
+            }
+        config.filter_words = dict(zip(row['filter_patterns'] or (),
+                                       row['filter_is_regex'] or ()))
+        return config
+
+    def all_voice_roles(self) -> frozenset:
+        """
+        Returns every role handed out by any voice channel
+        Cached until the voice role map changes
+        """
+        if self.voice_role_ids is None:
+            self.voice_role_ids = frozenset().union(
+                *self.voice_roles.values())
+        return self.voice_role_ids
+
+    def uses_channel(self, channel_id: int) -> bool:
+        """
+        Returns whether any cached setting references the channel
+        :param channel_id: the channel to look for
+        """
+        return (
+            channel_id in self.modlog_channels
+            or channel_id in self.logging_channels
+            or channel_id in self.voice_channels
+            or channel_id in self.welcome_channels
+            or channel_id in self.blacklist_channels
+            or channel_id in self.slowmode_channels
+            or channel_id in self.voice_roles
+            or channel_id in self.role_greetings
+        )
+
+
+def guild_settings(config: GuildConfig) -> dict:
     """
+    Returns the hot settings the bot reads on every message
+    :param config: the guild's cached config
+    """
+    return {
+        'prefix': config.prefix,
+        'modlog_enabled': config.modlog_enabled,
+        'logging_enabled': config.logging_enabled,
+        'invites_allowed': config.invites_allowed
+    }
+
 
+class ServerSettings(dict):
     """
-    #################################################################################
-    idk why this is here anymore
-    #################################################################################
+    `guild_settings` for every guild keyed by guild id
+    A guild that hasn't been loaded gets the defaults on first access
+    instead of a KeyError, and `on_missing` is called with its id so its
+    row can be created
     """
+    __slots__ = ('on_missing',)
 
+    def __init__(self, *args, on_missing=None):
+        super().__init__(*args)
+        self.on_missing = on_missing
 
-    autoassign = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.autoassign(
-      serverid BIGINT references {schema}.servers(serverid),
-      role_id BIGINT,
-      addtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (role_id)
-    );
+    def __missing__(self, guild_id: int):
+        settings = self[guild_id] = guild_settings(GuildConfig())
+        if self.on_missing is not None:
+            self.on_missing(guild_id)
+        return settings
+
+
+class GuildConfigCache():
+    """
+    Write-through cache of guild settings keyed by guild id
+    Reads never touch the db, the PostgresController keeps it in sync
+    Role greetings are also indexed by role id across every guild
     """
+    __slots__ = ('guilds', 'greetings_by_role')
+
+    def __init__(self):
+        self.guilds = {}
+        # role_id -> {channel_id: role greeting row}
+        self.greetings_by_role = {}
+
+    def __contains__(self, guild_id: int):
+        return guild_id in self.guilds
+
+    def __len__(self):
+        return len(self.guilds)
+
+    def get(self, guild_id: int) -> GuildConfig:
+        """
+        Returns the config for a guild, creating a default one if missing
+        :param guild_id: guild to get the config for
+        """
+        try:
+            return self.guilds[guild_id]
+        except KeyError:
+            config = self.guilds[guild_id] = GuildConfig()
+            return config
+
+    def load(self, guilds: dict):
+        """
+        Replaces every cached config and rebuilds the greeting index
+        :param guilds: dict of guild id to GuildConfig
+        """
+        self.guilds = guilds
+        self.greetings_by_role = {}
+        for config in guilds.values():
+            for greeting in config.role_greetings.values():
+                self.add_greeting(greeting)
+
+    def add_greeting(self, greeting: dict):
+        """
+        Caches a role greeting row in its guild and in the role index
+        :param greeting: dict with serverid, channel_id, role_id, greeting
+        """
+        channel_id = greeting['channel_id']
+        role_greetings = self.get(greeting['serverid']).role_greetings
+        previous = role_greetings.get(channel_id)
+        if previous is not None:
+            self.remove_greeting(previous['role_id'], channel_id)
+        role_greetings[channel_id] = greeting
+        self.greetings_by_role.setdefault(
+            greeting['role_id'], {})[channel_id] = greeting
+
+    def remove_greeting(self, role_id: int, channel_id: int):
+        """
+        Drops a role greeting from its guild and the role index
+        :param role_id: role the greeting is for
+        :param channel_id: channel the greeting is posted in
+        """
+        greetings = self.greetings_by_role.get(role_id)
+        if not greetings:
+            return
+        greeting = greetings.pop(channel_id, None)
+        if not greetings:
+            del self.greetings_by_role[role_id]
+        if greeting is not None:
+            self.get(greeting['serverid']).role_greetings.pop(
+                channel_id, None)
+
+    def role_greetings(self, role_id: int) -> list:
+        """
+        Returns every greeting for a role, empty for most roles
+        :param role_id: role to get greetings for
+        """
+        greetings = self.greetings_by_role.get(role_id)
+        if not greetings:
+            return []
+        return list(greetings.values())
 
-    warnings = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.warnings(
-      serverid BIGINT,
-      userid BIGINT,
-      indexid INT,
-      reason text,
-      major BOOLEAN DEFAULT FALSE,
-      logtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (serverid, userid, indexid)
-    );"""
-
-    moderation = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.moderation (
-      serverid BIGINT,
-      moderatorid BIGINT,
-      userid BIGINT,
-      indexid INT,
-      action INT,
-      reason text,
-      logtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (serverid, userid, indexid)
-    );"""
-
-    slowchannels = f"""
-    CREATE TABLE IF NOT EXISTS {schema}.slowmode (
-      serverid BIGINT,
-      channelid BIGINT,
-      interval INT,
-      logtime TIMESTAMP DEFAULT current_timestamp,
-      PRIMARY KEY (serverid, channelid)
-    );"""
-
-    await pool.execute(servers)
-    await pool.execute(voice_roles)
-    await pool.execute(voice_logging)
-    await pool.execute(role_greetings)
-    await pool.execute(modlog_channels)
-    await pool.execute(welcome_channels)
-    await pool.execute(logging_channels)
-    await pool.execute(assignableroles)
-    await pool.execute(blacklist_channels)
-    await pool.execute(warnings)
-    await pool.execute(moderation)
-    await pool.execute(autoassign)
-    await pool.execute(slowchannels)
+    def clear(self):
+        self.guilds.clear()
+        self.greetings_by_role.clear()
 
 
 class PostgresController():
     """
     We will use the schema 'yinbot' for the db
     """
-    __slots__ = ('pool', 'schema', 'logger')
+    __slots__ = ('pool', 'schema', 'logger', 'cache', 'message_partitions',
+                 'queries', 'adding_servers')
 
-    def __init__(self, pool: Pool, logger, schema: str = 'yinbot'):
+    def __init__(self, pool: Pool, logger, schema: str = 'yinbot',
+                 queries: QueryRegistry = None):
         self.pool = pool
         self.schema = schema
+        self.queries = queries or QueryRegistry(schema)
+        self.queries.pool = pool
         self.logger = logger
+        self.cache = GuildConfigCache()
+        self.message_partitions = set()
+        # guilds with a default row being inserted after a settings miss
+        self.adding_servers = set()
+
+    @property
+    def metrics(self):
+        return self.queries.metrics
 
     @classmethod
     async def get_instance(cls, logger=None, connect_kwargs: dict = None,
-                           pool: Pool = None, schema: str = 'yinbot'):
+                           pool: Pool = None, schema: str = 'yinbot',
+                           pool_settings: dict = None):
         """
         Get a new instance of `PostgresController`
-        This method will create the appropriate tables needed.
+        This method will migrate the schema to the latest version.
         :param logger: the logger object.
         :param connect_kwargs:
             Keyword arguments for the
@@ -220,6 +378,8 @@ class PostgresController():
         :param pool: an existing connection pool.
         One of `pool` or `connect_kwargs` must not be None.
         :param schema: the schema name used. Defaults to `minoshiro`
+        :param pool_settings: the postgres_pool config section, see
+        `pool_options`
         :return: a new instance of `PostgresController`
         """
         assert logger, (
@@ -230,32 +390,101 @@ class PostgresController():
             'a dict of connection data for creating a new '
             'connection pool.'
         )
+        queries = QueryRegistry(schema)
         if not pool:
             try:
-                pool = await create_pool(**connect_kwargs)
+                pool = await create_pool(
+                    init=queries.prepare,
+                    **{**connect_kwargs, **pool_options(pool_settings or {})}
+                )
                 logger.info('Connection pool made.')
             except InterfaceError as e:
                 logger.error(str(e))
                 raise e
-        logger.info('Creating tables...')
-        await make_tables(pool, schema)
-        logger.info('Tables created.')
-        return cls(pool, logger, schema)
+            try:
+                return await cls.setup(pool, logger, schema, queries)
+            except Exception:
+                # don't leak the pool's connections when startup is retried
+                await pool.close()
+                raise
+        return await cls.setup(pool, logger, schema, queries)
+
+    @classmethod
+    async def setup(cls, pool: Pool, logger, schema: str,
+                    queries: QueryRegistry):
+        """
+        Migrates the schema and fills the cache for a new controller
+        """
+        await migrate(pool, schema, logger)
+        # connections made from here on get the hot queries prepared
+        queries.ready = True
+        controller = cls(pool, logger, schema, queries)
+        await controller.load_guild_configs()
+        logger.info(f'Cached settings for {len(controller.cache)} guilds.')
+        return controller
+
+    async def warm_up(self, connections: int = 10, max_size: int = 10,
+                      timeout: float = 10.0) -> int:
+        """
+        Makes sure the pool has connections open, answering and with the
+        hot queries prepared before they are needed, so the first events
+        after startup don't pay for connecting or parsing
+        :param connections: connections to warm. Defaults to asyncpg's
+        default min size
+        :param max_size: the pool's max size, more connections than that
+        can't be held at once
+        :param timeout: seconds to wait for each connection, the ones
+        that aren't ready in time are left cold
+        :return: number of connections warmed
+        """
+        connections = max(0, min(connections, max_size))
+        acquired = await asyncio.gather(
+            *[asyncio.wait_for(self.pool.acquire(), timeout)
+              for _ in range(connections)],
+            return_exceptions=True)
+        cons = [con for con in acquired if not isinstance(con, Exception)]
+        try:
+            for con in acquired:
+                if isinstance(con, Exception) and \
+                        not isinstance(con, asyncio.TimeoutError):
+                    raise con
+            await asyncio.gather(*[con.fetchval('SELECT 1') for con in cons])
+            # connections opened before the schema was migrated
+            await asyncio.gather(*[
+                self.queries.prepare(con) for con in cons
+                if not self.queries.is_prepared(con)
+            ])
+        finally:
+            for con in cons:
+                await self.pool.release(con)
+        if len(cons) < connections:
+            self.logger.warning(
+                f'Only {len(cons)} of {connections} database connections '
+                f'were ready within {timeout} seconds')
+        return len(cons)
+
+    async def get_guild_configs(self):
+        """
+        Returns a GuildConfig for every server in the db
+        Every settings table is aggregated per server in a single query
+        so startup cost doesn't grow with the number of guilds
+        """
+        rows = await self.queries.fetch('get_guild_configs')
+        return {row['serverid']: GuildConfig.from_record(row) for row in rows}
+
+    async def load_guild_configs(self):
+        """
+        Replaces the config cache with a fresh copy from the db
+        """
+        self.cache.load(await self.get_guild_configs())
 
     async def add_server(self, guild_id: int):
         """
         Inserts into the server table a new server
         :param guild_id: the id of the server added
         """
-        sql = """
-        INSERT INTO {}.servers VALUES
-        ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-        ON CONFLICT (serverid)
-        DO nothing;
-        """.format(self.schema)
-
-        await self.pool.execute(
-            sql,
+        await self.queries.execute(
+            'add_server',
             guild_id,
             '-',
             False,
@@ -268,71 +497,162 @@ class PostgresController():
             f'This is an automated message',
             datetime.datetime.now()
             )
+        self.cache.get(guild_id)
+
+    async def get_server_ids(self) -> set:
+        """
+        Returns the id of every server in the db
+        """
+        return {row['serverid'] for row in await self.queries.fetch(
+            'get_server_ids')}
+
+    async def add_servers(self, guild_ids: list) -> int:
+        """
+        Inserts default rows for many servers in one statement
+        :param guild_ids: ids of the servers to add
+        :return: the number of servers actually inserted
+        """
+        status = await self.queries.execute(
+            'add_servers',
+            guild_ids,
+            f'Welcome %user%!',
+            f'This is an automated message'
+            )
+        for guild_id in guild_ids:
+            self.cache.get(guild_id)
+        return int(status.split()[-1])
 
     async def get_server_settings(self):
         """
         Returns the custom prefix for the server
+        Built from the config cache, so this never hits the db
         """
-        prefix_dict = {}
-        sql = """
-        SELECT serverid, prefix, modlog_enabled,
-        logging_enabled, invites_allowed
-        FROM {}.servers;
-        """.format(self.schema)
-        val_list = await self.pool.fetch(sql)
-        for row in val_list:
-            prefix_dict[row['serverid']] = {
-                'prefix': row['prefix'],
-                'modlog_enabled': row['modlog_enabled'],
-                'logging_enabled': row['logging_enabled'],
-                'invites_allowed': row['invites_allowed']
-                }
-        return prefix_dict
+        return ServerSettings(
+            ((guild_id, guild_settings(config))
+             for guild_id, config in self.cache.guilds.items()),
+            on_missing=self.add_missing_server
+        )
+
+    def add_missing_server(self, guild_id: int):
+        """
+        Inserts the default row for a guild found missing from the
+        settings, in the background and once at a time per guild, so the
+        settings updates and child table inserts that follow have a row
+        to work with
+        :param guild_id: the guild that had no settings
+        """
+        if guild_id in self.adding_servers:
+            return
+        self.adding_servers.add(guild_id)
+        asyncio.ensure_future(self.insert_missing_server(guild_id))
+
+    async def insert_missing_server(self, guild_id: int):
+        try:
+            await self.add_server(guild_id)
+            self.logger.info(f'Added missing server {guild_id}.')
+        except Exception as e:
+            self.logger.warning(
+                f'Error adding missing server {guild_id}: {e}')
+        finally:
+            self.adding_servers.discard(guild_id)
 
     async def get_server(self, server_id: int, logger):
         """
         Returns all server settings
         :param server_id: server to find info on
         """
-        sql = f"""
-        SELECT * FROM {self.schema}.servers as servers
-        WHERE serverid = $1
-        """
         try:
-            return await self.pool.fetchrow(sql, server_id)
+            return await self.queries.fetchrow('get_server', server_id)
         except Exception as e:
             logger.warning(f'Error getting server settings {e}')
             return False
 
-    async def add_whitelist_word(self, guild_id: int, word: str):
+    async def add_filter_word(
+            self, guild_id: int, pattern: str, is_regex: bool, logger):
         """
-        Adds a word that is allowed on the whitelist channels
+        Adds a word or regex to the servers message filter
         :param guild_id: the id of the server to add the word to
-        :param word: word to add
+        :param pattern: word or regex to add
+        :param is_regex: whether the pattern is a regex or a plain word
+        """
+        try:
+            await self.queries.execute(
+                'add_filter_word', guild_id, pattern, is_regex)
+            self.cache.get(guild_id).filter_words[pattern] = is_regex
+            return True
+        except Exception as e:
+            logger.warning(f'Error adding filter word to {guild_id}: {e}')
+            return False
+
+    async def rem_filter_word(self, guild_id: int, pattern: str, logger):
         """
-        return
+        Removes a word or regex from the servers message filter
+        Raises ValueError if the pattern isn't in the filter
+        :param guild_id: the id of the server to remove the word from
+        :param pattern: word or regex to remove
+        """
+        filter_words = self.cache.get(guild_id).filter_words
+        if pattern not in filter_words:
+            raise ValueError(pattern)
+        try:
+            await self.queries.execute('rem_filter_word', guild_id, pattern)
+            filter_words.pop(pattern, None)
+        except Exception as e:
+            logger.warning(f'Error removing filter word: {e}')
+            return False
+        return True
+
+    async def get_filter_words(self, guild_id: int):
+        """
+        Returns a dict of filtered words/regexes to whether they are a regex
+        :param guild_id: guild to get the filter for
+        """
+        return dict(self.cache.get(guild_id).filter_words)
+
+    async def ensure_message_partitions(self, months):
+        """
+        Creates the monthly messages partitions if they don't exist yet
+        :param months: iterable of (year, month) tuples
+        """
+        for year, month in months:
+            if (year, month) in self.message_partitions:
+                continue
+            start = datetime.datetime(year, month, 1)
+            end = datetime.datetime(
+                year + month // 12, month % 12 + 1, 1)
+            sql = f"""
+            CREATE TABLE IF NOT EXISTS
+            {self.schema}.messages_y{year}m{month:02d}
+            PARTITION OF {self.schema}.messages
+            FOR VALUES FROM ('{start}') TO ('{end}');
+            """
+            with self.metrics.timed('ensure_message_partitions'):
+                await self.pool.execute(sql)
+            self.message_partitions.add((year, month))
+
+    async def add_messages(self, records: list):
+        """
+        Bulk copies message records into the archive
+        :param records: list of tuples as built by `message_record`
+        """
+        await self.ensure_message_partitions(
+            {(r[7].year, r[7].month) for r in records})
+        async with self.metrics.acquire(self.pool) as conn:
+            with self.metrics.timed('add_messages'):
+                await conn.copy_records_to_table(
+                    'messages',
+                    records=records,
+                    columns=MESSAGE_COLUMNS,
+                    schema_name=self.schema
+                )
 
     async def add_message(self, message):
         """
         Adds a message to the database
+        Prefer batching through MessageArchiver for live traffic
         :param message: the discord message object to add
         """
-        sql = """
-        INSERT INTO {}.messages VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        ON CONFLICT (messageid)
-        DO nothing;
-        """.format(self.schema)
-        await self.pool.execute(
-            sql,
-            message.guild.id,
-            message.id,
-            message.author.id,
-            message.channel.id,
-            message.author.bot,
-            message.pinned,
-            message.clean_content,
-            message.created_at
-        )
+        await self.add_messages([message_record(message)])
 
     async def is_role_assignable(self, guild_id: int, role_id: int):
         """
@@ -340,14 +660,7 @@ class PostgresController():
         :param guild_id: guild to look in
         :param role_id: role to check
         """
-        sql = """
-        SELECT * FROM {}.assignable_roles
-        WHERE serverid = $1
-        AND role_id = $2;
-        """.format(self.schema)
-
-        row = await self.pool.fetchrow(sql, guild_id, role_id)
-        return True if row else False
+        return role_id in self.cache.get(guild_id).assignable_roles
 
     async def add_assignable_role(self, guild_id: int, role_id: int, logger):
         """
@@ -355,14 +668,10 @@ class PostgresController():
         :param guild_id: guild to add role to
         :param role_id: role to add
         """
-        sql = """
-        INSERT INTO {}.assignable_roles
-        VALUES ($1, $2)
-        ON CONFLICT (role_id)
-        DO nothing;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, role_id)
+            await self.queries.execute(
+                'add_assignable_role', guild_id, role_id)
+            self.cache.get(guild_id).assignable_roles.add(role_id)
             return True
         except Exception as e:
             logger.warning(f'Error adding role to server {guild_id}: {e}')
@@ -375,13 +684,10 @@ class PostgresController():
         :param guild_id: guild to remove role from
         :param role_id: role to remove
         """
-        sql = """
-        DELETE from {}.assignable_roles
-        WHERE serverid = $1
-        AND role_id = $2
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, role_id)
+            await self.queries.execute(
+                'remove_assignable_role', guild_id, role_id)
+            self.cache.get(guild_id).assignable_roles.discard(role_id)
         except Exception as e:
             logger.warning(f'Error removing roles: {e}')
             return False
@@ -392,19 +698,7 @@ class PostgresController():
         returns a list of assignable roles array for the server
         :param guild_id: guild to remove role from
         """
-        sql = """
-        SELECT * FROM {}.assignable_roles
-        WHERE serverid = $1;
-        """.format(self.schema)
-
-        role_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                role_list.append(row['role_id'])
-            return role_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).assignable_roles)
 
     async def add_modlog_channel(self, guild_id: int, channel_id: int, logger):
         """
@@ -412,20 +706,13 @@ class PostgresController():
         :param guild_id: guild to add channel to
         :param channel_id: channel to add
         """
-        sql = """
-        INSERT INTO {}.modlog_channels
-        VALUES ($1, $2)
-        ON CONFLICT (channel_id)
-        DO nothing;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET modlog_enabled = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
-            await self.pool.execute(boolsql, True, guild_id)
+            await self.queries.execute(
+                'add_modlog_channel', guild_id, channel_id)
+            await self.queries.execute('set_modlog_enabled', True, guild_id)
+            config = self.cache.get(guild_id)
+            config.modlog_channels.add(channel_id)
+            config.modlog_enabled = True
             return True
         except Exception as e:
             logger.warning(f'Error adding channel to server {guild_id}: {e}')
@@ -439,20 +726,15 @@ class PostgresController():
         """
         channel_list = await self.get_modlogs(guild_id)
         channel_list.remove(channel_id)
-        sql = """
-        DELETE FROM {}.modlog_channels
-        WHERE serverid = $1
-        AND channel_id = $2;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET modlog_enabled = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'rem_modlog_channel', guild_id, channel_id)
+            config = self.cache.get(guild_id)
+            config.modlog_channels.discard(channel_id)
             if not channel_list:
-                await self.pool.execute(boolsql, False, guild_id)
+                await self.queries.execute(
+                    'set_modlog_enabled', False, guild_id)
+                config.modlog_enabled = False
         except Exception as e:
             logger.warning(f'Error removing modlog channel: {e}')
             return False
@@ -463,18 +745,25 @@ class PostgresController():
         Returns a list of channel ids for posting mod actions
         :param guild_id: guild to search roles for
         """
-        sql = """
-        SELECT * FROM {}.modlog_channels
-        WHERE serverid = $1;
-        """.format(self.schema)
-        channel_list = []
+        return list(self.cache.get(guild_id).modlog_channels)
+
+    async def set_raid_threshold(
+            self, guild_id: int, threshold: Optional[int], logger):
+        """
+        Sets how many joins within the raid window switch the server to
+        batched joins
+        :param guild_id: guild to set the threshold for
+        :param threshold: joins allowed, None to use the config default
+        """
         try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+            await self.queries.execute(
+                'set_raid_join_threshold', threshold, guild_id)
+            self.cache.get(guild_id).raid_join_threshold = threshold
+            return True
+        except Exception as e:
+            logger.warning(
+                f'Error setting raid threshold for {guild_id}: {e}')
+            return False
 
     async def set_prefix(self, guild_id: int, prefix: str, logger):
         """
@@ -482,13 +771,9 @@ class PostgresController():
         :param guild_id: guild to set prefix for
         :param prefix: prefix to set, limit 2 chars
         """
-        sql = """
-        UPDATE {}.servers
-        SET prefix = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, prefix, guild_id)
+            await self.queries.execute('set_prefix', prefix, guild_id)
+            self.cache.get(guild_id).prefix = prefix
             return True
         except Exception as e:
             logger.warning(f'Error setting prefix for {guild_id}: {e}')
@@ -500,14 +785,11 @@ class PostgresController():
         :param guild_id: Guild to update message for
         :param message: string to insert
         """
-        sql = """
-        UPDATE {}.servers
-        SET welcome_message = $1
-        WHERE serverid = $2
-        """.format(self.schema)
 
         try:
-            await self.pool.execute(sql, message, guild_id)
+            await self.queries.execute(
+                'set_welcome_message', message, guild_id)
+            self.cache.get(guild_id).welcome_message = message
             return True
         except Exception as e:
             logger.warning(f'Issue setting welcome_message: {e}')
@@ -518,16 +800,7 @@ class PostgresController():
         Returns the welcome message string if it exists
         :param guild_id: guild to get welcome message for
         """
-        sql = """
-        SELECT welcome_message from {}.servers
-        WHERE serverid = $1
-        """.format(self.schema)
-        try:
-            message = await self.pool.fetchrow(sql, guild_id)
-            return message['welcome_message']
-        except Exception as e:
-            logger.warning(f'Error while getting welcome message: {e}')
-            return None
+        return self.cache.get(guild_id).welcome_message
 
     async def set_ban_footer(self, guild_id: int, message: str, logger):
         """
@@ -535,14 +808,10 @@ class PostgresController():
         :param guild_id: Guild to update footer for
         :param message: string to insert
         """
-        sql = """
-        UPDATE {}.servers
-        SET ban_footer = $1
-        WHERE serverid = $2
-        """.format(self.schema)
 
         try:
-            await self.pool.execute(sql, message, guild_id)
+            await self.queries.execute('set_ban_footer', message, guild_id)
+            self.cache.get(guild_id).ban_footer = message
             return True
         except Exception as e:
             logger.warning(f'Issue setting ban footer: {e}')
@@ -553,16 +822,7 @@ class PostgresController():
         Returns the ban footer string if it exists
         :param guild_id: guild to get footer for
         """
-        sql = """
-        SELECT ban_footer from {}.servers
-        WHERE serverid = $1
-        """.format(self.schema)
-        try:
-            message = await self.pool.fetchrow(sql, guild_id)
-            return message['ban_footer']
-        except Exception as e:
-            logger.warning(f'Error while getting ban footer: {e}')
-            return None
+        return self.cache.get(guild_id).ban_footer
 
     async def set_kick_footer(self, guild_id: int, message: str, logger):
         """
@@ -570,14 +830,10 @@ class PostgresController():
         :param guild_id: Guild to update footer for
         :param message: string to insert
         """
-        sql = """
-        UPDATE {}.servers
-        SET kick_footer = $1
-        WHERE serverid = $2
-        """.format(self.schema)
 
         try:
-            await self.pool.execute(sql, message, guild_id)
+            await self.queries.execute('set_kick_footer', message, guild_id)
+            self.cache.get(guild_id).kick_footer = message
             return True
         except Exception as e:
             logger.warning(f'Issue setting kick footer: {e}')
@@ -588,16 +844,7 @@ class PostgresController():
         Returns the ban footer string if it exists
         :param guild_id: guild to get footer for
         """
-        sql = """
-        SELECT kick_footer from {}.servers
-        WHERE serverid = $1
-        """.format(self.schema)
-        try:
-            message = await self.pool.fetchrow(sql, guild_id)
-            return message['kick_footer']
-        except Exception as e:
-            logger.warning(f'Error while getting kick footer: {e}')
-            return None
+        return self.cache.get(guild_id).kick_footer
 
     async def add_welcome_channel(
             self, guild_id: int, channel_id: int, logger):
@@ -606,14 +853,10 @@ class PostgresController():
         :param guild_id: guild to add channel to
         :param channel_id: channel to add
         """
-        sql = """
-        INSERT INTO {}.welcome_channels
-        VALUES ($1, $2)
-        ON CONFLICT (channel_id)
-        DO nothing;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'add_welcome_channel', guild_id, channel_id)
+            self.cache.get(guild_id).welcome_channels.add(channel_id)
             return True
         except Exception as e:
             logger.warning(f'Error adding channel to server {guild_id}: {e}')
@@ -628,13 +871,10 @@ class PostgresController():
         """
         channel_list = await self.get_welcome_channels(guild_id, logger)
         channel_list.remove(channel_id)
-        sql = """
-        DELETE FROM {}.welcome_channels
-        WHERE serverid = $1
-        AND channel_id = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'rem_welcome_channel', guild_id, channel_id)
+            self.cache.get(guild_id).welcome_channels.discard(channel_id)
         except Exception as e:
             logger.warning(f'Error removing modlog channel: {e}')
             return False
@@ -645,18 +885,7 @@ class PostgresController():
         Retrieves and returns the welcome channel list
         :param guild_id: guild to retrieve channels for
         """
-        sql = """
-        SELECT * FROM {}.welcome_channels
-        WHERE serverid = $1;
-        """.format(self.schema)
-        channel_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).welcome_channels)
 
     async def add_logger_channel(self, guild_id: int, channel_id: int, logger):
         """
@@ -664,20 +893,13 @@ class PostgresController():
         :param guild_id: guild to add channel to
         :param channel_id: channel to add
         """
-        sql = """
-        INSERT INTO {}.logging_channels
-        VALUES ($1, $2)
-        ON CONFLICT (channel_id)
-        DO nothing;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET logging_enabled = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
-            await self.pool.execute(boolsql, True, guild_id)
+            await self.queries.execute(
+                'add_logger_channel', guild_id, channel_id)
+            await self.queries.execute('set_logging_enabled', True, guild_id)
+            config = self.cache.get(guild_id)
+            config.logging_channels.add(channel_id)
+            config.logging_enabled = True
             return True
         except Exception as e:
             logger.warning(f'Error adding channel to server {guild_id}: {e}')
@@ -691,20 +913,15 @@ class PostgresController():
         """
         channel_list = await self.get_logger_channels(guild_id)
         channel_list.remove(channel_id)
-        sql = """
-        DELETE FROM {}.logging_channels
-        WHERE serverid = $1
-        AND channel_id = $2;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET logging_enabled = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'rem_logger_channel', guild_id, channel_id)
+            config = self.cache.get(guild_id)
+            config.logging_channels.discard(channel_id)
             if not channel_list:
-                await self.pool.execute(boolsql, False, guild_id)
+                await self.queries.execute(
+                    'set_logging_enabled', False, guild_id)
+                config.logging_enabled = False
         except Exception as e:
             logger.warning(f'Error removing logging channel: {e}')
             return False
@@ -715,38 +932,19 @@ class PostgresController():
         Returns a list of channel ids for posting mod actions
         :param guild_id: guild to search roles for
         """
-        sql = """
-        SELECT * FROM {}.logging_channels
-        WHERE serverid = $1;
-        """.format(self.schema)
-        channel_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).logging_channels)
 
     async def get_voice_enabled(self, guild_id: int):
         """
         Returns the boolean voice_enabled for given server
         """
-        sql = """
-        SELECT voice_enabled FROM {}.servers
-        WHERE serverid = $1;
-        """.format(self.schema)
-        return await self.pool.fetchval(sql, guild_id)
+        return self.cache.get(guild_id).voice_enabled
 
     async def get_voice_logging(self, guild_id: int):
         """
         Returns the boolean voice_enabled for given server
         """
-        sql = """
-        SELECT voice_logging FROM {}.servers
-        WHERE serverid = $1;
-        """.format(self.schema)
-        return await self.pool.fetchval(sql, guild_id)
+        return self.cache.get(guild_id).voice_logging
 
     async def add_voice_channel(self, guild_id: int, channel_id: int, logger):
         """
@@ -754,20 +952,13 @@ class PostgresController():
         :param guild_id: guild to add channel to
         :param channel_id: channel to add
         """
-        sql = """
-        INSERT INTO {}.voice_logging
-        VALUES ($1, $2)
-        ON CONFLICT (channel_id)
-        DO nothing;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET voice_logging = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
-            await self.pool.execute(boolsql, True, guild_id)
+            await self.queries.execute(
+                'add_voice_channel', guild_id, channel_id)
+            await self.queries.execute('set_voice_logging', True, guild_id)
+            config = self.cache.get(guild_id)
+            config.voice_channels.add(channel_id)
+            config.voice_logging = True
             return True
         except Exception as e:
             logger.warning(f'Error adding channel to server {guild_id}: {e}')
@@ -781,20 +972,15 @@ class PostgresController():
         """
         channel_list = await self.get_voice_channels(guild_id)
         channel_list.remove(channel_id)
-        sql = """
-        DELETE FROM {}.voice_logging
-        WHERE serverid = $1
-        AND channel_id = $2;
-        """.format(self.schema)
-        boolsql = """
-        UPDATE {}.servers
-        SET voice_logging = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'rem_voice_channel', guild_id, channel_id)
+            config = self.cache.get(guild_id)
+            config.voice_channels.discard(channel_id)
             if not channel_list:
-                await self.pool.execute(boolsql, False, guild_id)
+                await self.queries.execute(
+                    'set_voice_logging', False, guild_id)
+                config.voice_logging = False
         except Exception as e:
             logger.warning(f'Error removing logging channel: {e}')
             return False
@@ -805,75 +991,39 @@ class PostgresController():
         Returns a list of channel ids for posting mod actions
         :param guild_id: guild to search roles for
         """
-        sql = """
-        SELECT * FROM {}.voice_logging
-        WHERE serverid = $1;
-        """.format(self.schema)
-        channel_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).voice_channels)
 
     async def get_server_roles(self, guild_id: int):
         """
         Returns a list of enabled voice roles for a guild
         """
-        sql = """
-        SELECT role_id FROM {}.voice_roles
-        WHERE serverid = $1;
-        """.format(self.schema)
-        role_list = []
-        records = await self.pool.fetch(sql, guild_id)
-        for rec in records:
-            role_list.append(rec['role_id'])
-        return role_list
+        return list(self.cache.get(guild_id).all_voice_roles())
 
     async def get_role_channels(self, guild_id: int, role_id: int):
         """
         Returns a list of channels for a given role
         """
-        sql = """
-        SELECT * FROM {}.voice_roles
-        WHERE serverid = $1 AND roleid = $2;
-        """.format(self.schema)
-        channel_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id, role_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        voice_roles = self.cache.get(guild_id).voice_roles
+        return [channel_id for channel_id, roles in voice_roles.items()
+                if role_id in roles]
 
     async def get_channel_roles(self, guild_id: int, channel_id: int):
         """
         Returns a list of roles that have a channel_id in them
         """
-        sql = """
-        SELECT role_id FROM {}.voice_roles
-        WHERE serverid = $1 AND channel_id = $2
-        """.format(self.schema)
-        records = await self.pool.fetch(sql, guild_id, channel_id)
-        role_list = []
-        for rec in records:
-            role_list.append(rec['role_id'])
-        return role_list
+        return list(
+            self.cache.get(guild_id).voice_roles.get(channel_id, ()))
 
     async def add_role_channel(self, guild_id: int, channel_id: int, role_id):
         """
         Adds a given channel_id to a given roleod
         :param guild_id: guild to pull role from
         """
-        sql = """
-        INSERT INTO {}.voice_roles VALUES ($1, $2, $3)
-        ON CONFLICT (role_id, channel_id) DO NOTHING;
-        """.format(self.schema, self.schema)
-        await self.pool.execute(
-            sql, guild_id, role_id, channel_id)
+        await self.queries.execute(
+            'add_role_channel', guild_id, role_id, channel_id)
+        config = self.cache.get(guild_id)
+        config.voice_roles.setdefault(channel_id, set()).add(role_id)
+        config.voice_role_ids = None
         return True
 
     async def rem_role_channel(
@@ -883,26 +1033,28 @@ class PostgresController():
         :param guild_id: guild to remove modlog channel from
         :param channel_id: channel id to remove
         """
-        sql = """
-        DELETE FROM {}.voice_roles
-        WHERE channel_id = $1 AND role_id = $2
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, channel_id, role_id)
+            await self.queries.execute('rem_role_channel', channel_id, role_id)
         except Exception as e:
             logger.warning(f'Error removing role channel: {e}')
             return False
+        config = self.cache.get(guild_id)
+        roles = config.voice_roles.get(channel_id)
+        if roles is not None:
+            roles.discard(role_id)
+            if not roles:
+                del config.voice_roles[channel_id]
+        config.voice_role_ids = None
         return True
 
     async def purge_voice_roles(self, guild_id: int):
         """
         Removes all roles from a given server.
         """
-        sql = """
-        DELETE FROM {}.voice_roles
-        WHERE serverid = $1;
-        """.format(self.schema)
-        await self.pool.execute(sql, guild_id)
+        await self.queries.execute('purge_voice_roles', guild_id)
+        config = self.cache.get(guild_id)
+        config.voice_roles.clear()
+        config.voice_role_ids = None
 
     async def set_voice_enabled(self, guild_id: int, value: bool):
         """
@@ -910,12 +1062,8 @@ class PostgresController():
         :param guild_id: guild to set voice_enabled
         :param value: boolean to set variable to
         """
-        sql = """
-        UPDATE {}.servers
-        SET voice_enabled = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
-        await self.pool.execute(sql, value, guild_id)
+        await self.queries.execute('set_voice_enabled', value, guild_id)
+        self.cache.get(guild_id).voice_enabled = value
 
     async def set_invites_allowed(self, guild_id: int, value: bool):
         """
@@ -923,12 +1071,8 @@ class PostgresController():
         :param guild_id: guild to set voice_enabled
         :param value: boolean to set variable to
         """
-        sql = """
-        UPDATE {}.servers
-        SET invites_allowed = $1
-        WHERE serverid = $2;
-        """.format(self.schema)
-        await self.pool.execute(sql, value, guild_id)
+        await self.queries.execute('set_invites_allowed', value, guild_id)
+        self.cache.get(guild_id).invites_allowed = value
 
     async def add_blacklist_channel(
             self, guild_id: int, channel_id: int, logger):
@@ -937,14 +1081,12 @@ class PostgresController():
         :param guild_id: guild to add channel to
         :param channel_id: channel to add
         """
-        sql = """
-        INSERT INTO {}.blacklist_channels
-        VALUES ($1, $2)
-        ON CONFLICT (channel_id)
-        DO nothing;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'add_blacklist_channel', guild_id, channel_id)
+            config = self.cache.get(guild_id)
+            config.blacklist_channels = \
+                config.blacklist_channels | {channel_id}
             return True
         except Exception as e:
             logger.warning(f'Error adding channel to server {guild_id}: {e}')
@@ -957,13 +1099,12 @@ class PostgresController():
         :param guild_id: guild to remove modlog channel from
         :param channel_id: channel id to remove
         """
-        sql = """
-        DELETE FROM {}.blacklist_channels
-        WHERE serverid = $1
-        AND channel_id = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, channel_id)
+            await self.queries.execute(
+                'rem_blacklist_channel', guild_id, channel_id)
+            config = self.cache.get(guild_id)
+            config.blacklist_channels = \
+                config.blacklist_channels - {channel_id}
             return True
         except Exception as e:
             logger.warning(f'Error removing modlog channel: {e}')
@@ -974,116 +1115,55 @@ class PostgresController():
         Returns a list of channel ids for posting mod actions
         :param guild_id: guild to search roles for
         """
-        sql = """
-        SELECT * FROM {}.blacklist_channels
-        WHERE serverid = $1;
-        """.format(self.schema)
-        channel_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).blacklist_channels)
 
     async def get_all_blacklist_channels(self):
         """
         Returns a list of channel ids for posting mod actions
         :param guild_id: guild to search roles for
         """
-        sql = """
-        SELECT channel_id FROM {}.blacklist_channels;
-        """.format(self.schema)
         channel_list = []
-        try:
-            rows = await self.pool.fetch(sql)
-            for row in rows:
-                channel_list.append(row['channel_id'])
-            return channel_list
-        except Exception:
-            return []
+        for config in self.cache.guilds.values():
+            channel_list.extend(config.blacklist_channels)
+        return channel_list
 
     """
     Moderations
     """
 
-    async def get_modaction_indexes(self, guild_id, user_id):
-        """
-        Returns a count of modactions a user has
-        :param guild_id: guild to search modactions
-        :param user_id: user id to count for
-        """
-        sql = """
-        SELECT indexid FROM {}.moderation
-        WHERE serverid = $1 AND userid = $2;
-        """.format(self.schema)
-        sql_i = await self.pool.fetch(sql, guild_id, user_id)
-        return list(map(lambda m: m['indexid'], sql_i))
-
     async def get_moderation_count(self, guild_id, user_id):
         """
         Returns a count of moderations a user has
         :param guild_id: guild to search moderations
         :param user_id: user id to count for
         """
-        sql = """
-        SELECT COUNT(userid) FROM {}.moderation
-        WHERE serverid = $1 AND userid = $2;
-        """.format(self.schema)
-        return await self.pool.fetchval(sql, guild_id, user_id)
+        return await self.queries.fetchval(
+            'get_moderation_count', guild_id, user_id)
 
     async def insert_modaction(self, guild_id: int, mod_id: int,
                                target_id: int, reason: str,
                                action_type: Action):
         """
         Inserts into the roles table a new rolechange
+        The index is allocated by postgres in the same statement
         :param mod_id: the id of the mod that triggered the action
         :param target_id: the id of user that action was performed on
         :param action_type: The type of change that occured
+        :return: the index of the new modaction
         """
-        sql = """
-        INSERT INTO {}.moderation VALUES ($1, $2, $3, $4, $5, $6);
-        """.format(self.schema)
-
-        moderations = await self.get_moderation_count(guild_id, target_id)
-        all_modac_i = await self.get_modaction_indexes(guild_id, target_id)
-        if all_modac_i:
-            index = max(all_modac_i) + 1
-        else:
-            index = 1
-
-        await self.pool.execute(
-            sql, 
-            guild_id,
-            mod_id,
-            target_id,
-            index,
-            action_type.value,
-            reason
-        )
-
-    async def get_moderation(self, guild_id: int, user_id: int, logger, recent=False):
-        """
-        Returns all moderation that a user has been done to
-        :param guild_id: guild to search moderations
-        :param user_id: user id to count for
-        """
-        if recent:
-            sql = """
-            SELECT * FROM {}.moderation
-            WHERE serverid = $1 AND userid = $2 AND (logtime >= DATE_TRUNC('month', now()) - INTERVAL '6 month');
-            """.format(self.schema)
-        else:
-            sql = """
-            SELECT * FROM {}.moderation
-            WHERE serverid = $1 AND userid = $2;
-            """.format(self.schema)
-        try:
-            return await self.pool.fetch(sql, guild_id, user_id)
-        except Exception as e:
-            logger.warning(f'Error retrieving moderations {e}')
-            return False
+        for attempt in range(INDEX_RETRIES):
+            try:
+                return await self.queries.fetchval(
+                    'insert_modaction',
+                    guild_id,
+                    mod_id,
+                    target_id,
+                    action_type.value,
+                    reason
+                )
+            except UniqueViolationError:
+                if attempt == INDEX_RETRIES - 1:
+                    raise
 
     async def get_single_modaction(self, guild_id: int, user_id: int, index: int, logger):
         """
@@ -1092,12 +1172,9 @@ class PostgresController():
         :param user_id: user id to count for
         :param index: index to pull
         """
-        sql = """
-        SELECT * FROM {}.moderation
-        WHERE serverid = $1 AND userid = $2 AND indexid = $3;
-        """.format(self.schema)
         try:
-            return await self.pool.fetch(sql, guild_id, user_id, index)
+            return await self.queries.fetch(
+                'get_single_modaction', guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error retrieving moderation action {e}')
             return False
@@ -1112,12 +1189,10 @@ class PostgresController():
         :param index: index to pull
         :param reason: reason for moderation
         """
-        sql = """
-        UPDATE {}.moderation
-        SET reason=$1, moderatorid=$2, action=$3 WHERE serverid = $4 AND userid = $5 AND indexid = $6;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, reason, mod_id, action_type.value, guild_id, user_id, index)
+            await self.queries.execute(
+                'set_single_modaction', reason, mod_id, action_type.value,
+                guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error retrieving moderation action {e}')
         return await self.get_moderation_count(guild_id, user_id)
@@ -1130,12 +1205,9 @@ class PostgresController():
         :param user_id: user id to count for
         :param index: index to pull
         """
-        sql = """
-        DELETE FROM {}.moderation
-        WHERE serverid = $1 AND userid = $2 AND indexid = $3;
-        """.format(self.schema)
         try:
-            return await self.pool.execute(sql, guild_id, user_id, index)
+            return await self.queries.execute(
+                'delete_single_modaction', guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error deleting moderation action {e}')
             return False
@@ -1150,59 +1222,38 @@ class PostgresController():
         :param guild_id: guild to search infractions
         :param user_id: user id to count for
         """
-        sql = """
-        SELECT COUNT(userid) FROM {}.warnings
-        WHERE serverid = $1 AND userid = $2;
-        """.format(self.schema)
-        return await self.pool.fetchval(sql, guild_id, user_id)
-
-    async def get_warning_indexes(self, guild_id, user_id):
-        """
-        Returns a count of infractions a user has
-        :param guild_id: guild to search infractions
-        :param user_id: user id to count for
-        """
-        sql = """
-        SELECT indexid FROM {}.warnings
-        WHERE serverid = $1 AND userid = $2;
-        """.format(self.schema)
-        sql_i = await self.pool.fetch(sql, guild_id, user_id)
-        return list(map(lambda m: m['indexid'], sql_i))
+        return await self.queries.fetchval(
+            'get_warning_count', guild_id, user_id)
 
     async def add_warning(
             self, guild_id: int, user_id: str,
             reason: str, major: bool, logger):
         """
         Takes a userid and string and inserts it into the guild's
-        warning log
+        warning log, the index is allocated by postgres in the same statement
         :param guild_id: guild to search infractions
         :param user_id: user id to count for
         :param reason: reason for warning
         :param major: whether warning is a major/minor warning
+        :return: how many warnings the user had before this one
         """
-        infraction_count = await self.get_warning_count(guild_id, user_id)
-        all_warn_i = await self.get_warning_indexes(guild_id, user_id)
-        if all_warn_i:
-            index = max(all_warn_i) + 1
-        else:
-            index = 1
-
-        sql = """
-        INSERT INTO {}.warnings VALUES ($1, $2, $3, $4, $5);
-        """.format(self.schema)
-        try:
-            await self.pool.execute(
-                sql,
-                guild_id,
-                user_id,
-                index,
-                reason,
-                major
-            )
-            return infraction_count
-        except Exception as e:
-            logger.warning(f'Error inserting warning into db: {e}')
-            return False
+        for attempt in range(INDEX_RETRIES):
+            try:
+                return await self.queries.fetchval(
+                    'add_warning',
+                    guild_id,
+                    user_id,
+                    reason,
+                    major
+                )
+            except UniqueViolationError:
+                if attempt == INDEX_RETRIES - 1:
+                    logger.warning(
+                        f'Error allocating warning index for {user_id}')
+                    return False
+            except Exception as e:
+                logger.warning(f'Error inserting warning into db: {e}')
+                return False
 
     async def get_single_warning(self, guild_id: int, user_id: int, index: int, logger):
         """
@@ -1211,12 +1262,9 @@ class PostgresController():
         :param user_id: user id to count for
         :param index: index to pull
         """
-        sql = """
-        SELECT * FROM {}.warnings
-        WHERE serverid = $1 AND userid = $2 AND indexid = $3;
-        """.format(self.schema)
         try:
-            return await self.pool.fetch(sql, guild_id, user_id, index)
+            return await self.queries.fetch(
+                'get_single_warning', guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error retrieving warning {e}')
             return False
@@ -1231,12 +1279,9 @@ class PostgresController():
         :param reason: reason for warning
         :param major: whether warning is a major/minor warning
         """
-        sql = """
-        UPDATE {}.warnings
-        SET reason=$1, major=$2 WHERE serverid = $3 AND userid = $4 AND indexid = $5;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, reason, major, guild_id, user_id, index)
+            await self.queries.execute(
+                'set_single_warning', reason, major, guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error retrieving warnings {e}')
         return await self.get_warning_count(guild_id, user_id)
@@ -1249,38 +1294,160 @@ class PostgresController():
         :param user_id: user id to count for
         :param index: index to pull
         """
-        sql = """
-        DELETE FROM {}.warnings
-        WHERE serverid = $1 AND userid = $2 AND indexid = $3;
-        """.format(self.schema)
         try:
-            return await self.pool.execute(sql, guild_id, user_id, index)
+            return await self.queries.execute(
+                'delete_single_warning', guild_id, user_id, index)
         except Exception as e:
             logger.warning(f'Error deleting warning {e}')
             return False
 
-    async def get_warnings(self, guild_id: int, user_id: int, logger, recent = False):
-        """
-        Returns all warnings a user has on a server
-        :param guild_id: guild to search infractions
-        :param user_id: user id to count for
-        """
+    async def get_history_page(self, table: str, guild_id: int,
+                               user_id: int, after=None,
+                               limit: int = 10, recent=False):
+        """
+        Returns one page of a users warnings or moderations
+        Seeks from the last row of the previous page instead of using an
+        offset so every page costs the same no matter how long the
+        history is. The full history walks the (serverid, userid, indexid)
+        key, recent history the (serverid, userid, logtime) index
+        :param table: either 'warnings' or 'moderation'
+        :param guild_id: guild to search
+        :param user_id: user id to get the history for
+        :param after: cursor returned for the previous page, None to start
+        :param limit: rows per page
+        :return: (rows, cursor to pass for the next page or None)
+        """
+        assert table in HISTORY_TABLES, f'Unknown history table {table}'
         if recent:
-            f = '%Y-%m-%d'
-            sql = """
-            SELECT * FROM {}.warnings
-            WHERE serverid = $1 AND userid = $2 AND (logtime >= DATE_TRUNC('month', now()) - INTERVAL '6 month') ORDER BY indexid;
-            """.format(self.schema)
+            logtime, index = after or (datetime.datetime.min, 0)
+            rows = await self.queries.fetch(
+                f'{table}_recent_page', guild_id, user_id, logtime, index,
+                limit + 1)
         else:
-            sql = """
-            SELECT * FROM {}.warnings
-            WHERE serverid = $1 AND userid = $2 ORDER BY indexid;
-            """.format(self.schema)
-        try:
-            return await self.pool.fetch(sql, guild_id, user_id)
-        except Exception as e:
-            logger.warning(f'Error retrieving warnings {e}')
-            return False
+            rows = await self.queries.fetch(
+                f'{table}_page', guild_id, user_id, after or 0, limit + 1)
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        if recent:
+            return rows[:limit], (last['logtime'], last['indexid'])
+        return rows[:limit], last['indexid']
+
+    async def has_older_history(self, table: str, guild_id: int,
+                                user_id: int):
+        """
+        Returns whether a user has warnings or moderations older than
+        the 6 month window shown by default
+        :param table: either 'warnings' or 'moderation'
+        :param guild_id: guild to search
+        :param user_id: user id to check
+        """
+        assert table in HISTORY_TABLES, f'Unknown history table {table}'
+        return await self.queries.fetchval(
+            f'{table}_has_older', guild_id, user_id)
+
+    async def delete_channel_rows(self, condition: str, *args):
+        """
+        Deletes matching rows from every table in CHANNEL_TABLES
+        Each table is cleaned with a single statement in its own
+        transaction and the cache is updated from the deleted rows
+        :param condition: where clause, {column} is the channel column
+        :param args: query arguments for the condition
+        :return: dict of table name to number of rows removed
+        """
+        removed = {}
+        # GuildConfig channel set -> guilds that lost a channel from it
+        touched = {}
+        async with self.metrics.acquire(self.pool) as conn:
+            for table, column, attribute in CHANNEL_TABLES:
+                sql = """
+                DELETE FROM {}.{} WHERE {}
+                RETURNING *;
+                """.format(
+                    self.schema, table, condition.format(column=column))
+                with self.metrics.timed('delete_channel_rows'):
+                    async with conn.transaction():
+                        rows = await conn.fetch(sql, *args)
+                for row in rows:
+                    self.uncache_channel_row(table, attribute, row[column], row)
+                if rows and attribute in CHANNEL_FLAGS:
+                    touched.setdefault(attribute, set()).update(
+                        row['serverid'] for row in rows)
+                removed[table] = len(rows)
+            await self.disable_empty_channel_flags(conn, touched)
+        return removed
+
+    async def disable_empty_channel_flags(self, conn, touched: dict):
+        """
+        Turns off modlog, logging or voice logging for guilds that just
+        lost their last channel for it, in the db and the config cache
+        :param conn: connection to run the updates on
+        :param touched: GuildConfig channel set -> ids of guilds that lost
+        a channel from it
+        """
+        for attribute, guild_ids in touched.items():
+            flag = CHANNEL_FLAGS[attribute]
+            disabled = {}
+            for guild_id in guild_ids:
+                config = self.cache.guilds.get(guild_id)
+                if config is None or getattr(config, attribute):
+                    continue
+                if getattr(config, flag):
+                    disabled[guild_id] = config
+            if not disabled:
+                continue
+            name = f'set_{flag}'
+            with self.metrics.timed(name):
+                await conn.executemany(
+                    self.queries.sql[name],
+                    [(False, guild_id) for guild_id in disabled])
+            for config in disabled.values():
+                setattr(config, flag, False)
+
+    def uncache_channel_row(self, table: str, attribute, channel_id, row):
+        """
+        Drops a deleted channel row from the config cache
+        :param table: table the row was deleted from
+        :param attribute: GuildConfig set the channel is cached in
+        :param channel_id: the channel id of the row
+        :param row: the deleted row
+        """
+        if table == 'role_greetings':
+            self.cache.remove_greeting(row['role_id'], channel_id)
+            return
+        config = self.cache.guilds.get(row['serverid'])
+        if config is None:
+            return
+        if attribute is not None:
+            getattr(config, attribute).discard(channel_id)
+        elif table == 'blacklist_channels':
+            config.blacklist_channels = \
+                config.blacklist_channels - {channel_id}
+        elif table == 'voice_roles':
+            config.voice_roles.pop(channel_id, None)
+            config.voice_role_ids = None
+
+    async def remove_channels(self, channel_ids: list):
+        """
+        Removes the given channels from every channel table
+        :param channel_ids: ids of deleted channels
+        :return: dict of table name to number of rows removed
+        """
+        return await self.delete_channel_rows(
+            '{column} = ANY($1::bigint[])', channel_ids)
+
+    async def remove_dangling_channels(
+            self, guild_ids: list, live_channel_ids: list):
+        """
+        Removes every channel of the given guilds that no longer exists
+        :param guild_ids: guilds whose channel list is known to be complete
+        :param live_channel_ids: every channel id those guilds still have
+        :return: dict of table name to number of rows removed
+        """
+        return await self.delete_channel_rows(
+            'serverid = ANY($1::bigint[]) AND {column} NOT IN '
+            '(SELECT unnest($2::bigint[]))',
+            guild_ids, live_channel_ids)
 
     async def add_slowmode_channel(
             self, server_id: int, channel_id: int, time: int, logger):
@@ -1290,11 +1457,10 @@ class PostgresController():
         :param channel_id: channel to add
         :param time: time in seconds to set slowmode for
         """
-        sql = """
-        INSERT INTO {}.slowmode VALUES ($1, $2, $3);
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, server_id, channel_id, time)
+            await self.queries.execute(
+                'add_slowmode_channel', server_id, channel_id, time)
+            self.cache.get(server_id).slowmode_channels.add(channel_id)
             return True
         except Exception as e:
             logger.warning(f'Error adding slowmode channel to database: {e}')
@@ -1307,12 +1473,10 @@ class PostgresController():
         :param server_id: server to add channel for
         :param channel_id: channel to add
         """
-        sql = """
-        DELETE FROM {}.slowmode
-        WHERE serverid = $1 AND channelid = $2;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, server_id, channel_id)
+            await self.queries.execute(
+                'rem_slowmode_channel', server_id, channel_id)
+            self.cache.get(server_id).slowmode_channels.discard(channel_id)
             return True
         except Exception as e:
             logger.warning(f'Error removing slowmode channel to database: {e}')
@@ -1322,12 +1486,9 @@ class PostgresController():
         """
         Returns all slowmode channels
         """
-        sql = """
-        SELECT * FROM {}.slowmode;
-        """.format(self.schema)
         try:
             ret_channels = {}
-            channels = await self.pool.fetch(sql)
+            channels = await self.queries.fetch('get_slowmode_channels')
             for channel in channels:
                 ret_channels[channel['channelid']] = channel['interval']
             return ret_channels
@@ -1342,14 +1503,10 @@ class PostgresController():
         :param guild_id: guild to add role to
         :param role_id: role to add
         """
-        sql = """
-        INSERT INTO {}.autoassign
-        VALUES ($1, $2)
-        ON CONFLICT (role_id)
-        DO nothing;
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, role_id)
+            await self.queries.execute(
+                'add_autoassign_role', guild_id, role_id)
+            self.cache.get(guild_id).autoassign_roles.add(role_id)
             return True
         except Exception as e:
             logger.warning(f'Error adding role to server {guild_id}: {e}')
@@ -1362,13 +1519,10 @@ class PostgresController():
         :param guild_id: guild to remove role from
         :param role_id: role to remove
         """
-        sql = """
-        DELETE from {}.autoassign
-        WHERE serverid = $1
-        AND role_id = $2
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, guild_id, role_id)
+            await self.queries.execute(
+                'remove_autoassign_role', guild_id, role_id)
+            self.cache.get(guild_id).autoassign_roles.discard(role_id)
         except Exception as e:
             logger.warning(f'Error removing roles: {e}')
             return False
@@ -1379,19 +1533,7 @@ class PostgresController():
         returns a list of autoassign roles array for the server
         :param guild_id: guild to remove role from
         """
-        sql = """
-        SELECT * FROM {}.autoassign
-        WHERE serverid = $1;
-        """.format(self.schema)
-
-        role_list = []
-        try:
-            rows = await self.pool.fetch(sql, guild_id)
-            for row in rows:
-                role_list.append(row['role_id'])
-            return role_list
-        except Exception:
-            return []
+        return list(self.cache.get(guild_id).autoassign_roles)
 
     async def set_role_greeting(self, guild_id: int, channel_id: int, role_id: int, message: str, logger):
         """
@@ -1399,14 +1541,16 @@ class PostgresController():
         :param guild_id: Guild to update message for
         :param message: string to insert
         """
-        sql = """
-        INSERT INTO {}.role_greetings
-        VALUES ($1, $2, $3, $4)
-        """.format(self.schema)
 
         try:
-            await self.pool.execute(
-                sql, guild_id, channel_id, role_id, message)
+            await self.queries.execute(
+                'set_role_greeting', guild_id, channel_id, role_id, message)
+            self.cache.add_greeting({
+                'serverid': guild_id,
+                'channel_id': channel_id,
+                'role_id': role_id,
+                'greeting': message
+            })
             return True
         except Exception as e:
             logger.warning(f'Issue setting role greetings: {e}')
@@ -1417,49 +1561,21 @@ class PostgresController():
         Returns the rolegreetings if it exists
         :param role_id: role to get channels/messages for
         """
-        sql = """
-        SELECT * from {}.role_greetings
-        WHERE role_id = $1
-        """.format(self.schema)
-        try:
-            greetings = await self.pool.fetch(sql, role_id)
-            return greetings
-        except Exception as e:
-            logger.warning(f'Error while getting role greetings: {e}')
-            return None
+        return self.cache.role_greetings(role_id)
 
     async def get_channel_role_greeting(self, role_id: int, channel_id: int, logger):
         """
         Returns the rolegreetings if it exists
         :param role_id: role to get channels/messages for
         """
-        sql = """
-        SELECT * from {}.role_greetings
-        WHERE role_id = $1
-        AND channel_id = $2
-        """.format(self.schema)
-        try:
-            greetings = await self.pool.fetchrow(sql, role_id, channel_id)
-            return greetings
-        except Exception as e:
-            logger.warning(f'Error while getting role greetings: {e}')
-            return None
+        return self.cache.greetings_by_role.get(role_id, {}).get(channel_id)
 
     async def get_all_role_greetings(self, guild_id: int, logger):
         """
         Returns the rolegreetings if it exists
         :param role_id: role to get channels/messages for
         """
-        sql = """
-        SELECT * from {}.role_greetings
-        WHERE serverid = $1
-        """.format(self.schema)
-        try:
-            greetings = await self.pool.fetch(sql, guild_id)
-            return greetings
-        except Exception as e:
-            logger.warning(f'Error while getting role greetings: {e}')
-            return None
+        return list(self.cache.get(guild_id).role_greetings.values())
 
     async def del_role_greeting(self, role_id: int, channel_id: int, logger):
         """
@@ -1467,14 +1583,11 @@ class PostgresController():
         :param guild_id: guild to remove role from
         :param role_id: role to remove
         """
-        sql = """
-        DELETE from {}.role_greetings
-        WHERE channel_id = $1
-        AND role_id = $2
-        """.format(self.schema)
         try:
-            await self.pool.execute(sql, channel_id, role_id)
+            await self.queries.execute(
+                'del_role_greeting', channel_id, role_id)
         except Exception as e:
             logger.warning(f'Error removing role_greeting: {e}')
             return False
+        self.cache.remove_greeting(role_id, channel_id)
         return True
@@ -0,0 +1,169 @@
+"""
+Concurrent delivery of the same message to a set of channels.
+Used by the logging listeners so a guild with several log channels
+waits roughly as long as a single send, and one broken channel
+can't stop the others from getting the message. High-churn events
+(joins, role changes) are coalesced per channel by the LogBatcher so
+bursts don't run into per-channel rate limits.
+"""
+import asyncio
+
+from .embeds import LogBatchEmbed
+
+
+class ChannelDispatcher():
+    """
+    Sends to many channels at once with a cap on in-flight requests
+    Failures are recorded per channel id in `failures` as
+    [consecutive failure count, last error] and cleared on the next success.
+    Channels that no longer exist aren't tracked, and only the
+    `max_failures` most recently failing channels are kept
+    """
+    __slots__ = ('bot', 'semaphore', 'failures', 'max_failures')
+
+    def __init__(self, bot, max_concurrency: int = 5,
+                 max_failures: int = 1000):
+        self.bot = bot
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.failures = {}
+        self.max_failures = max_failures
+
+    def record_failure(self, channel_id: int, error, label: str):
+        """
+        Tracks a failed send and logs it
+        :param channel_id: channel the send was meant for
+        :param error: the exception (or reason) it failed with
+        :param label: short description of what was being logged
+        """
+        # re-inserted so the dict stays ordered by last failure
+        failure = self.failures.pop(channel_id, None) or [0, None]
+        failure[0] += 1
+        failure[1] = error
+        self.failures[channel_id] = failure
+        if len(self.failures) > self.max_failures:
+            del self.failures[next(iter(self.failures))]
+        self.bot.logger.info(
+            f'Error logging {label} in channel {channel_id}'
+            f', error: {error}'
+        )
+
+    async def send_one(self, channel_id: int, label: str, **kwargs):
+        """
+        Sends to a single channel, never raises
+        :param channel_id: channel to send to
+        :param label: short description of what is being logged
+        :param kwargs: passed straight to `channel.send`
+        :return: True if the message was sent
+        """
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            # gone for good, there is no later success to clear it
+            self.forget(channel_id)
+            self.bot.logger.info(
+                f'Error logging {label} in channel {channel_id}'
+                f', error: channel not found'
+            )
+            return False
+        async with self.semaphore:
+            try:
+                await channel.send(**kwargs)
+            except Exception as e:
+                self.record_failure(channel_id, e, label)
+                return False
+        self.failures.pop(channel_id, None)
+        return True
+
+    def forget(self, channel_id: int):
+        """
+        Drops the failures recorded for a channel, e.g. once it is deleted
+        :param channel_id: the channel id
+        """
+        self.failures.pop(channel_id, None)
+
+    async def send(self, channel_ids, label: str = 'message', **kwargs):
+        """
+        Sends the same message to every channel concurrently
+        :param channel_ids: iterable of channel ids to send to
+        :param label: short description of what is being logged
+        :param kwargs: passed straight to `channel.send`
+        :return: the number of channels that got the message
+        """
+        results = await asyncio.gather(
+            *[self.send_one(channel_id, label, **kwargs)
+              for channel_id in channel_ids]
+        )
+        return sum(results)
+
+
+class LogBatcher():
+    """
+    Per-channel outbound queue that coalesces log embeds
+    Embeds queued for a channel are held for up to `flush_window` seconds
+    and sent together as a single message, at most `max_batch` per message
+    """
+    __slots__ = ('dispatcher', 'flush_window', 'max_batch',
+                 'pending', 'timers')
+
+    def __init__(self, dispatcher: ChannelDispatcher,
+                 flush_window: float = 2.0, max_batch: int = 10):
+        self.dispatcher = dispatcher
+        self.flush_window = flush_window
+        # a batch is folded into the fields of one embed, which caps at 25
+        self.max_batch = max(1, min(max_batch, 25))
+        self.pending = {}
+        self.timers = {}
+
+    def queue(self, channel_ids, embed):
+        """
+        Queues an embed for every channel given
+        :param channel_ids: iterable of channel ids to send to
+        :param embed: the embed to send
+        """
+        loop = self.dispatcher.bot.loop
+        for channel_id in channel_ids:
+            pending = self.pending.setdefault(channel_id, [])
+            pending.append(embed)
+            if len(pending) >= self.max_batch:
+                timer = self.timers.pop(channel_id, None)
+                if timer:
+                    timer.cancel()
+                loop.create_task(self.flush(channel_id))
+            elif channel_id not in self.timers:
+                self.timers[channel_id] = loop.create_task(
+                    self.flush_later(channel_id))
+
+    async def flush_later(self, channel_id: int):
+        """
+        Flushes a channel once the flush window has passed
+        :param channel_id: channel to flush
+        """
+        await asyncio.sleep(self.flush_window)
+        self.timers.pop(channel_id, None)
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id: int):
+        """
+        Sends everything queued for a channel
+        :param channel_id: channel to flush
+        """
+        pending = self.pending.pop(channel_id, None)
+        if not pending:
+            return
+        for start in range(0, len(pending), self.max_batch):
+            batch = pending[start:start + self.max_batch]
+            if len(batch) == 1:
+                embed = batch[0]
+            else:
+                embed = LogBatchEmbed(batch)
+            await self.dispatcher.send_one(
+                channel_id, 'batched log', embed=embed)
+
+    async def close(self):
+        """
+        Cancels pending timers and sends whatever is still queued
+        """
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        await asyncio.gather(
+            *[self.flush(channel_id) for channel_id in list(self.pending)])
@@ -7,6 +7,7 @@ the mod log
 
 import discord
 import datetime
+import time
 
 from .enums import Action
 
@@ -32,6 +33,15 @@ def return_current_time():
     return time.strftime('%A, %b %d %H:%M')
 
 
+def page_footer(page: int=None):
+    """
+    Returns the footer for a paged embed, just the time when unpaged
+    """
+    if page is None:
+        return return_current_time()
+    return f'Page {page} | {return_current_time()}'
+
+
 class InternalErrorEmbed(discord.Embed):
     """
     Embed for when it isn't the users fault
@@ -240,6 +250,31 @@ class JoinEmbed(discord.Embed):
         self.set_footer(text=return_current_time())
 
 
+class JoinSpikeEmbed(discord.Embed):
+    """
+    Embed summarizing a burst of joins
+    """
+    def __init__(self, joining_users: list):
+        """
+        Init class for embed
+        """
+        local_title = f'{len(joining_users)} users joined'
+        lines = [
+            f'{user.name}#{user.discriminator} ({user.id})'
+            for user in joining_users
+        ]
+        local_desc = '\n'.join(lines)
+        if len(local_desc) > 2048:
+            local_desc = local_desc[:2000].rsplit('\n', 1)[0] + \
+                f'\n...and more'
+        super().__init__(
+            color=POSITIVECOLOR,
+            title=local_title,
+            description=local_desc,
+            )
+        self.set_footer(text=return_current_time())
+
+
 class LeaveEmbed(discord.Embed):
     """
     Embed for when a user leaves the server
@@ -499,6 +534,28 @@ class VoiceChannelMoveEmbed(discord.Embed):
         self.set_footer(text=return_current_time())
 
 
+class LogBatchEmbed(discord.Embed):
+    """
+    Embed that folds several queued log embeds into one message
+    """
+    def __init__(self, log_embeds: list):
+        """
+        init class for embed
+        """
+        local_title = f'{len(log_embeds)} logged events'
+        super().__init__(
+            color=log_embeds[0].color,
+            title=local_title,
+            )
+        for log_embed in log_embeds[:25]:
+            self.add_field(
+                name=str(log_embed.title)[:256],
+                value=str(log_embed.description)[:1024],
+                inline=False
+            )
+        self.set_footer(text=return_current_time())
+
+
 class WarningEditEmbed(discord.Embed):
     """
     Embed for when someone gets warned
@@ -561,7 +618,7 @@ class WarningListEmbed(discord.Embed):
     Embed that lists all a users infractions
     """
     def __init__(self, warned_user: discord.Member, infractions: list,
-                 logger, count: bool=False):
+                 logger, count: bool=False, page: int=None):
 
         local_title = f'**{warned_user.name}#{warned_user.discriminator}'\
                       f'**\'s infractions'
@@ -600,7 +657,7 @@ class WarningListEmbed(discord.Embed):
                             name='Infractions:(cont)',
                             value=string
                         )
-        self.set_footer(text=return_current_time())
+        self.set_footer(text=page_footer(page))
 
 
 class ModerationListEmbed(discord.Embed):
@@ -608,7 +665,7 @@ class ModerationListEmbed(discord.Embed):
     Embed that lists all a users ModActions
     """
     def __init__(self, moderated_user: discord.Member,
-                 modactions: list, logger, count: bool=False):
+                 modactions: list, logger, count: bool=False, page: int=None):
 
         local_title = f'**{moderated_user.name}#{moderated_user.discriminator}'\
                       f'**\'s modactions'
@@ -647,7 +704,7 @@ class ModerationListEmbed(discord.Embed):
                             name='Modactions:(cont)',
                             value=string
                         )
-        self.set_footer(text=return_current_time())
+        self.set_footer(text=page_footer(page))
 
 class ModEditEmbed(discord.Embed):
     """
@@ -698,3 +755,40 @@ class MentionHelpEmbed(discord.Embed):
             description=local_desc,
             )
 
+
+
+class PoolStatsEmbed(discord.Embed):
+    """
+    Embed summarizing database pool metrics
+    """
+    def __init__(self, metrics, max_size: int):
+        """
+        Init class for embed
+        """
+        minutes = (time.monotonic() - metrics.started) / 60
+        wait = metrics.acquire_wait
+        local_title = 'Database Pool'
+        local_desc = f'Last {minutes:.0f} minutes\n'\
+                     f'**In use:** {metrics.in_use}/{max_size} '\
+                     f'(peak {metrics.peak_in_use})\n'\
+                     f'**Acquire wait:** {wait.count} acquires, '\
+                     f'mean {wait.mean * 1000:.1f}ms, '\
+                     f'p95 {wait.percentile(95) * 1000:.1f}ms, '\
+                     f'max {wait.max * 1000:.1f}ms'
+        super().__init__(
+            color=POSITIVECOLOR,
+            title=local_title,
+            description=local_desc,
+            )
+        lines = [
+            f'`{name}` {histogram.count}x '
+            f'mean {histogram.mean * 1000:.1f}ms '
+            f'p95 {histogram.percentile(95) * 1000:.1f}ms '
+            f'max {histogram.max * 1000:.1f}ms'
+            for name, histogram in metrics.slowest()
+        ]
+        self.add_field(
+            name='Queries by total time',
+            value='\n'.join(lines)[:1024] or 'None yet'
+        )
+        self.set_footer(text=return_current_time())
@@ -0,0 +1,201 @@
+"""
+Message filtering engine.
+Patterns are compiled once and each guild gets a cached GuildFilter
+built from its settings, so the per-message path is a dict lookup
+plus the cheapest checks that can rule a message out. A guild's
+banned words are folded into a prefix trie inside one pair of word
+boundaries, so each position of a message is tried once per character
+instead of once per word, and its regexes join the same alternation.
+Regexes with capturing groups are kept on their own, as joining them
+would clash on group names and shift numbered backreferences.
+"""
+import re
+
+INVITE_REGEX = re.compile(
+    r'(?:discord\.gg|discord(?:app)?\.com/invite)/[a-z0-9-]+',
+    re.IGNORECASE
+)
+
+# (?i) style flags that apply to the whole expression. Inside the group
+# an entry is wrapped in they either fail to compile or leak into every
+# other entry of the alternation
+GLOBAL_FLAGS_REGEX = re.compile(r'(?<!\\)\(\?[aiLmsux]+\)')
+
+
+def contains_invite(content: str) -> bool:
+    """
+    Checks a message for a discord invite link
+    Plain substring checks reject almost every message before the regex runs
+    :param content: the message content
+    """
+    if '/' not in content:
+        return False
+    if 'discord' not in content.lower():
+        return False
+    return INVITE_REGEX.search(content) is not None
+
+
+def word_pattern(pattern: str, is_regex: bool) -> str:
+    """
+    Returns the regex source for a single filter entry
+    Plain words only match on their own, not inside other words
+    :param pattern: the word or regex
+    :param is_regex: whether the pattern is already a regex
+    """
+    if is_regex:
+        return f'(?:{pattern})'
+    return rf'(?<!\w){re.escape(pattern)}(?!\w)'
+
+
+def trie_pattern(words) -> str:
+    """
+    Returns a regex matching any of the words with common prefixes shared
+    A flat alternation makes the engine try every word at every position
+    :param words: the plain words, they are escaped here
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        # the empty key marks the end of a word
+        node[''] = None
+    return _trie_source(trie)
+
+
+def _trie_source(node: dict) -> str:
+    branches = [
+        re.escape(char) + _trie_source(child)
+        for char, child in node.items() if char
+    ]
+    if not branches:
+        return ''
+    ends_here = '' in node
+    if len(branches) == 1 and not ends_here:
+        return branches[0]
+    source = '(?:{})'.format('|'.join(branches))
+    return source + '?' if ends_here else source
+
+
+def validate_regex(pattern: str):
+    """
+    Raises re.error if a regex can't be used as a filter entry
+    The check compiles the exact source the filter runs
+    :param pattern: the regex to check
+    """
+    if GLOBAL_FLAGS_REGEX.search(pattern):
+        raise re.error(
+            'global flags like (?i) are not supported, '
+            'scope them with (?i:...) instead')
+    re.compile(word_pattern(pattern, True), re.IGNORECASE)
+
+
+def compile_word_filter(filter_words: dict, logger=None) -> tuple:
+    """
+    Compiles the filter entries of a guild into as few regexes as possible
+    Plain words become one trie, regexes without capturing groups are
+    joined into the same alternation and regexes with groups are
+    compiled on their own. Entries that don't compile are skipped
+    :param filter_words: dict of word/regex to whether it is a regex
+    :param logger: optional logger to report bad regexes to
+    :return: tuple of compiled regexes, empty if there is nothing to match
+    """
+    words = [
+        pattern for pattern, is_regex in filter_words.items()
+        if not is_regex and pattern
+    ]
+    parts = [rf'(?<!\w){trie_pattern(words)}(?!\w)'] if words else []
+    separate = []
+    for pattern, is_regex in filter_words.items():
+        if not is_regex:
+            continue
+        source = word_pattern(pattern, True)
+        try:
+            validate_regex(pattern)
+            compiled = re.compile(source, re.IGNORECASE)
+        except re.error as e:
+            if logger:
+                logger.warning(f'Skipping bad filter regex {pattern}: {e}')
+            continue
+        if compiled.groups:
+            separate.append(compiled)
+        else:
+            parts.append(source)
+    if not parts:
+        return tuple(separate)
+    try:
+        combined = [re.compile('|'.join(parts), re.IGNORECASE)]
+    except re.error as e:
+        if logger:
+            logger.warning(f'Error combining filter regexes: {e}')
+        combined = [re.compile(part, re.IGNORECASE) for part in parts]
+    return tuple(combined + separate)
+
+
+class GuildFilter():
+    """
+    Compiled filter settings for a single guild
+    """
+    __slots__ = ('block_invites', 'word_regexes')
+
+    def __init__(self, block_invites: bool = False, word_regexes=()):
+        self.block_invites = block_invites
+        self.word_regexes = word_regexes
+
+    @property
+    def active(self) -> bool:
+        return self.block_invites or bool(self.word_regexes)
+
+    def matches(self, content: str) -> bool:
+        """
+        Returns True if the message should be removed
+        :param content: the message content
+        """
+        if self.block_invites and contains_invite(content):
+            return True
+        for word_regex in self.word_regexes:
+            if word_regex.search(content):
+                return True
+        return False
+
+
+class FilterEngine():
+    """
+    Builds and caches a GuildFilter per guild
+    Call `invalidate` whenever a guild's filter settings change
+    """
+    __slots__ = ('bot', 'guilds')
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds = {}
+
+    def build(self, guild_id: int) -> GuildFilter:
+        """
+        Compiles the filter for a guild from its settings
+        :param guild_id: guild to build the filter for
+        """
+        settings = self.bot.server_settings.get(guild_id, {})
+        filter_words = self.bot.pg_utils.cache.get(guild_id).filter_words
+        return GuildFilter(
+            block_invites=not settings.get('invites_allowed', True),
+            word_regexes=compile_word_filter(filter_words, self.bot.logger)
+        )
+
+    def get(self, guild_id: int) -> GuildFilter:
+        """
+        Returns the cached filter for a guild, building it on a miss
+        :param guild_id: guild to get the filter for
+        """
+        try:
+            return self.guilds[guild_id]
+        except KeyError:
+            guild_filter = self.guilds[guild_id] = self.build(guild_id)
+            return guild_filter
+
+    def invalidate(self, guild_id: int):
+        """
+        Drops the cached filter so it is rebuilt on the next message
+        :param guild_id: guild whose settings changed
+        """
+        self.guilds.pop(guild_id, None)
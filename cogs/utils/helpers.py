@@ -57,6 +57,104 @@ async def custom_confirm(ctx: commands.Context, custom_message):
     return True
 
 
+PAGE_BACK = '\N{BLACK LEFT-POINTING TRIANGLE}'
+PAGE_NEXT = '\N{BLACK RIGHT-POINTING TRIANGLE}'
+
+
+class Pager():
+    """
+    One reaction paged message that only ever holds one page in memory.
+    fetch_page - coroutine taking a cursor (None for the first page)
+                 and returning (rows, cursor of the next page or None).
+    build_embed - function taking (rows, page number) returning an embed.
+    skip_empty - send nothing if the first page has no rows.
+    Cursors of visited pages are kept so going back is one query too.
+    """
+    __slots__ = ('fetch_page', 'build_embed', 'skip_empty', 'cursors',
+                 'page', 'message')
+
+    def __init__(self, fetch_page, build_embed, skip_empty: bool = False):
+        self.fetch_page = fetch_page
+        self.build_embed = build_embed
+        self.skip_empty = skip_empty
+        self.cursors = [None]
+        self.page = 0
+        self.message = None
+
+    async def start(self, ctx: commands.Context) -> bool:
+        """
+        Sends the first page, returns whether there are more to page to
+        """
+        rows, next_cursor = await self.fetch_page(None)
+        if self.skip_empty and not rows:
+            return False
+        self.message = await ctx.send(embed=self.build_embed(rows, 1))
+        if next_cursor is None:
+            return False
+        self.cursors.append(next_cursor)
+        await self.message.add_reaction(PAGE_BACK)
+        await self.message.add_reaction(PAGE_NEXT)
+        return True
+
+    async def turn(self, emoji: str):
+        """
+        Shows the next or previous page for a reaction
+        """
+        page = self.page
+        if emoji == PAGE_NEXT:
+            if page + 1 >= len(self.cursors) or \
+                    self.cursors[page + 1] is None:
+                return
+            page += 1
+        else:
+            if page == 0:
+                return
+            page -= 1
+        self.page = page
+        rows, next_cursor = await self.fetch_page(self.cursors[page])
+        if page + 1 == len(self.cursors):
+            self.cursors.append(next_cursor)
+        await self.message.edit(embed=self.build_embed(rows, page + 1))
+
+
+async def paginate(ctx: commands.Context, *pagers: Pager,
+                   timeout: int = 60):
+    """
+    Sends the first page of every pager in the order given, then pages
+    all of them from a single reaction wait until it times out.
+    ctx - The context the pagers are shown in.
+    pagers - the Pager of every message to show.
+    """
+    active = {}
+    for pager in pagers:
+        if await pager.start(ctx):
+            active[pager.message.id] = pager
+    if not active:
+        return
+
+    def check(reaction, user):
+        return user == ctx.author and \
+            reaction.message.id in active and \
+            str(reaction.emoji) in (PAGE_BACK, PAGE_NEXT)
+
+    while True:
+        try:
+            reaction, user = await ctx.bot.wait_for(
+                'reaction_add', timeout=timeout, check=check)
+        except asyncio.TimeoutError:
+            break
+        try:
+            await reaction.message.remove_reaction(reaction.emoji, user)
+        except discord.HTTPException:
+            pass
+        await active[reaction.message.id].turn(str(reaction.emoji))
+    for pager in active.values():
+        try:
+            await pager.message.clear_reactions()
+        except discord.HTTPException:
+            pass
+
+
 def create_confirm_embed(ctx, server_name, member_to_kick, reason):
         embed = discord.Embed(
             title=f'❗ Confirmation Request ❗',
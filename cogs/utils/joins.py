@@ -0,0 +1,122 @@
+"""
+Join pipeline.
+Every member join goes through here instead of each cog listening on
+its own. Normally each registered stage handles the member right away,
+but when a guild's join rate goes over its threshold the joins are
+queued and handed to the stages in batches, so a raid costs a handful
+of messages and a bounded number of role edits instead of several
+db queries and api calls per member.
+"""
+import asyncio
+import time
+from collections import deque
+
+
+class JoinPipeline():
+    """
+    Routes joins to the registered stages, batching them during spikes
+    A stage is any object with the coroutines
+    `member_joined(member)` and `members_joined(guild, members)`
+    """
+    __slots__ = ('bot', 'threshold', 'window', 'flush_interval',
+                 'stages', 'joins', 'pending', 'timers')
+
+    def __init__(self, bot, threshold: int = 10, window: float = 10.0,
+                 flush_interval: float = 5.0):
+        self.bot = bot
+        self.threshold = threshold
+        self.window = window
+        self.flush_interval = flush_interval
+        self.stages = []
+        # guild_id -> deque of recent join times
+        self.joins = {}
+        # guild_id -> members waiting for the next batch
+        self.pending = {}
+        self.timers = {}
+
+    def register(self, stage):
+        if stage not in self.stages:
+            self.stages.append(stage)
+
+    def unregister(self, stage):
+        if stage in self.stages:
+            self.stages.remove(stage)
+
+    def threshold_for(self, guild_id: int) -> int:
+        """
+        Returns the guild's own raid threshold, or the global one
+        :param guild_id: guild to get the threshold for
+        """
+        threshold = self.bot.pg_utils.cache.get(guild_id).raid_join_threshold
+        return self.threshold if threshold is None else threshold
+
+    def is_spike(self, guild_id: int, now: float) -> bool:
+        """
+        Records a join and returns whether the guild is over its threshold
+        :param guild_id: guild the member joined
+        :param now: monotonic time of the join
+        """
+        joins = self.joins.setdefault(guild_id, deque())
+        joins.append(now)
+        while now - joins[0] > self.window:
+            joins.popleft()
+        return len(joins) > self.threshold_for(guild_id)
+
+    async def member_joined(self, member):
+        """
+        Handles a join right away, or queues it while the guild is spiking
+        :param member: the member that joined
+        """
+        guild_id = member.guild.id
+        spike = self.is_spike(guild_id, time.monotonic())
+        if spike or guild_id in self.pending:
+            self.pending.setdefault(guild_id, []).append(member)
+            if guild_id not in self.timers:
+                self.timers[guild_id] = self.bot.loop.create_task(
+                    self.flush_later(guild_id))
+            return
+        await asyncio.gather(*[
+            self.run_stage(stage.member_joined, member)
+            for stage in self.stages
+        ])
+
+    async def run_stage(self, handler, *args):
+        """
+        Runs one stage, a failing stage doesn't stop the others
+        """
+        try:
+            await handler(*args)
+        except Exception as e:
+            self.bot.logger.warning(
+                f'Error in join stage {handler.__qualname__}: {e}')
+
+    async def flush_later(self, guild_id: int):
+        await asyncio.sleep(self.flush_interval)
+        self.timers.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id: int):
+        """
+        Hands every queued member of a guild to the stages as one batch
+        :param guild_id: guild to flush
+        """
+        members = self.pending.pop(guild_id, None)
+        if not members:
+            return
+        self.bot.logger.info(
+            f'Join spike in {guild_id}, handling {len(members)} members')
+        guild = members[0].guild
+        await asyncio.gather(*[
+            self.run_stage(stage.members_joined, guild, members)
+            for stage in self.stages
+        ])
+
+    async def close(self):
+        """
+        Cancels pending timers and flushes whatever is still queued
+        """
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        await asyncio.gather(
+            *[self.flush(guild_id) for guild_id in list(self.pending)])
@@ -0,0 +1,105 @@
+"""
+Pre-dispatch stage for incoming messages.
+The bot's on_message builds one MessageContext per message and hands it
+to every registered handler, so the facts each handler needs (guild
+settings, cached config, author permissions) are looked up at most once
+per message instead of once per listener.
+"""
+import asyncio
+
+_UNSET = object()
+
+
+class MessageContext():
+    """
+    Facts about a message shared by every handler
+    Settings, config and permissions are only looked up when first used
+    """
+    __slots__ = ('bot', 'message', 'is_bot', 'in_guild',
+                 '_settings', '_config', '_permissions')
+
+    def __init__(self, bot, message):
+        self.bot = bot
+        self.message = message
+        self.is_bot = message.author.bot
+        self.in_guild = message.guild is not None
+        self._settings = _UNSET
+        self._config = _UNSET
+        self._permissions = _UNSET
+
+    @property
+    def settings(self):
+        """The guild's hot settings, None outside of guilds"""
+        if self._settings is _UNSET:
+            self._settings = self.bot.server_settings[
+                self.message.guild.id] if self.in_guild else None
+        return self._settings
+
+    @property
+    def config(self):
+        """The guild's cached GuildConfig, None outside of guilds"""
+        if self._config is _UNSET:
+            self._config = self.bot.pg_utils.cache.get(
+                self.message.guild.id) if self.in_guild else None
+        return self._config
+
+    @property
+    def permissions(self):
+        """The author's guild permissions, None if they aren't a member"""
+        if self._permissions is _UNSET:
+            self._permissions = getattr(
+                self.message.author, 'guild_permissions', None)
+        return self._permissions
+
+    @property
+    def prefix(self):
+        return self.settings['prefix'] if self.in_guild else None
+
+    @property
+    def maybe_command(self) -> bool:
+        """Whether the message starts with the guild's prefix"""
+        return self.in_guild and \
+            self.message.content.startswith(self.prefix)
+
+
+class MessageGate():
+    """
+    Hands every message to the registered handlers with a shared context
+    A handler is a coroutine function taking a MessageContext
+    """
+    __slots__ = ('bot', 'handlers')
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers = []
+
+    def register(self, handler):
+        if handler not in self.handlers:
+            self.handlers.append(handler)
+
+    def unregister(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    async def run_handler(self, handler, context: MessageContext):
+        """
+        Runs one handler, a failing handler doesn't stop the others
+        """
+        try:
+            await handler(context)
+        except Exception as e:
+            self.bot.logger.warning(
+                f'Error in message handler {handler.__qualname__}: {e}')
+
+    async def dispatch(self, message):
+        """
+        Builds the context for a message and runs every handler on it
+        :param message: the discord message
+        """
+        context = MessageContext(self.bot, message)
+        if len(self.handlers) == 1:
+            await self.run_handler(self.handlers[0], context)
+            return
+        await asyncio.gather(*[
+            self.run_handler(handler, context) for handler in self.handlers
+        ])
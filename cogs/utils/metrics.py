@@ -0,0 +1,122 @@
+"""
+Connection pool metrics.
+Every query PostgresController runs goes through `PoolMetrics`, which
+records how long it waited for a connection, how many connections are
+checked out and a latency histogram per query, so pool pressure during
+event bursts shows up in the dbstats command instead of as slow commands.
+"""
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager, contextmanager
+
+# Upper bounds of the histogram buckets in seconds, the last bucket
+# holds everything slower
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf')
+)
+
+
+class Histogram():
+    """
+    Counts observations into fixed buckets
+    Percentiles are the upper bound of the bucket they fall in
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the bucket bound under which `percent` of observations are
+        :param percent: between 0 and 100
+        """
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class PoolMetrics():
+    """
+    Acquire wait, connections in use and per query latency for a pool
+    """
+    __slots__ = ('acquire_wait', 'queries', 'in_use', 'peak_in_use',
+                 'started')
+
+    def __init__(self):
+        self.acquire_wait = Histogram()
+        # query or method name -> Histogram
+        self.queries = {}
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.started = time.monotonic()
+
+    @asynccontextmanager
+    async def acquire(self, pool):
+        """
+        Acquires a connection from the pool, recording the wait
+        :param pool: the asyncpg pool
+        """
+        start = time.perf_counter()
+        async with pool.acquire() as con:
+            self.acquire_wait.observe(time.perf_counter() - start)
+            self.in_use += 1
+            if self.in_use > self.peak_in_use:
+                self.peak_in_use = self.in_use
+            try:
+                yield con
+            finally:
+                self.in_use -= 1
+
+    @contextmanager
+    def timed(self, name: str):
+        """
+        Records how long the code inside the with block took
+        :param name: the query or method being timed
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram = self.queries.get(name)
+            if histogram is None:
+                histogram = self.queries[name] = Histogram()
+            histogram.observe(time.perf_counter() - start)
+
+    def slowest(self, limit: int = 10) -> list:
+        """
+        Returns (name, histogram) for the queries with the most total time
+        :param limit: how many queries to return
+        """
+        return sorted(
+            self.queries.items(),
+            key=lambda item: item[1].total,
+            reverse=True
+        )[:limit]
+
+    def reset(self):
+        self.acquire_wait = Histogram()
+        self.queries.clear()
+        self.peak_in_use = self.in_use
+        self.started = time.monotonic()
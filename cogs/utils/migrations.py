@@ -0,0 +1,396 @@
+"""
+Versioned schema migrations.
+Applied versions are recorded in the `schema_version` table. On startup
+only the version is read, DDL runs only when there are migrations the
+database hasn't seen yet. Each migration runs in its own transaction and
+moves data with set-based statements rather than row by row.
+To change the schema append a new `Migration` to `MIGRATIONS`, never
+edit one that has already shipped.
+"""
+import time
+
+# Key for pg_advisory_xact_lock so two bots starting against the same
+# database don't apply a migration twice
+MIGRATION_LOCK = 7301865433
+
+# Array columns servers had before 2019-05-09, the table and column each
+# one was split out into and the servers flag turned on when it has any
+# entries, as the old refactor script's add_* calls did
+LEGACY_SERVER_COLUMNS = (
+    ('modlog_channels', 'modlog_channels', 'channel_id', 'modlog_enabled'),
+    ('welcome_channels', 'welcome_channels', 'channel_id', None),
+    ('logging_channels', 'logging_channels', 'channel_id', 'logging_enabled'),
+    ('blacklist_channels', 'blacklist_channels', 'channel_id', None),
+    ('assignableroles', 'assignable_roles', 'role_id', None),
+    ('voice_channels', 'voice_logging', 'channel_id', 'voice_logging'),
+)
+
+
+class Migration():
+    """
+    A single schema version
+    `apply` is a coroutine function taking (connection, schema)
+    """
+    __slots__ = ('version', 'description', 'apply')
+
+    def __init__(self, version: int, description: str, apply):
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+async def create_tables(conn, schema: str):
+    """
+    Version 1, the tables as they were before versioning.
+    Uses IF NOT EXISTS so databases created by the old `make_tables`
+    are adopted as-is.
+    :param conn: the connection to run on.
+    :param schema: the schema name.
+    """
+
+    """
+    #################################################################################
+    This section is to be used for creating tables meant for server info and settings
+    #################################################################################
+    """
+
+    servers = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.servers (
+      serverid BIGINT,
+      prefix varchar(2),
+      voice_enabled boolean DEFAULT FALSE,
+      invites_allowed boolean DEFAULT TRUE,
+      voice_logging boolean DEFAULT FALSE,
+      modlog_enabled boolean DEFAULT FALSE,
+      welcome_message text,
+      logging_enabled boolean DEFAULT FALSE,
+      ban_footer text,
+      kick_footer text,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (serverid)
+    );"""
+
+    voice_roles = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.voice_roles (
+      serverid BIGINT references {schema}.servers(serverid),
+      role_id BIGINT,
+      channel_id BIGINT,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (role_id, channel_id)
+    );
+    """
+
+    voice_logging = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.voice_logging (
+      serverid BIGINT references {schema}.servers(serverid),
+      channel_id BIGINT,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );
+    """
+
+    modlog_channels = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.modlog_channels (
+      serverid BIGINT references {schema}.servers(serverid),
+      channel_id bigint,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );"""
+
+    welcome_channels = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.welcome_channels (
+      serverid BIGINT references {schema}.servers(serverid), 
+      channel_id BIGINT,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );"""
+
+    logging_channels = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.logging_channels (
+      serverid BIGINT references {schema}.servers(serverid),
+      channel_id bigint,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );"""
+
+    assignableroles = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.assignable_roles (
+      serverid BIGINT references {schema}.servers(serverid),
+      role_id bigint,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (role_id)
+    );"""
+
+    blacklist_channels = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.blacklist_channels (
+      serverid BIGINT references {schema}.servers(serverid),
+      channel_id bigint,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );"""
+
+    role_greetings = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.role_greetings (
+      serverid BIGINT references {schema}.servers(serverid),
+      channel_id bigint,
+      role_id bigint,
+      greeting TEXT,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (channel_id)
+    );
+    """
+
+    """
+    #################################################################################
+    idk why this is here anymore
+    #################################################################################
+    """
+
+
+    autoassign = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.autoassign(
+      serverid BIGINT references {schema}.servers(serverid),
+      role_id BIGINT,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (role_id)
+    );
+    """
+
+    warnings = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.warnings(
+      serverid BIGINT,
+      userid BIGINT,
+      indexid INT,
+      reason text,
+      major BOOLEAN DEFAULT FALSE,
+      logtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (serverid, userid, indexid)
+    );"""
+
+    moderation = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.moderation (
+      serverid BIGINT,
+      moderatorid BIGINT,
+      userid BIGINT,
+      indexid INT,
+      action INT,
+      reason text,
+      logtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (serverid, userid, indexid)
+    );"""
+
+    slowchannels = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.slowmode (
+      serverid BIGINT,
+      channelid BIGINT,
+      interval INT,
+      logtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (serverid, channelid)
+    );"""
+
+    filter_words = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.filter_words (
+      serverid BIGINT references {schema}.servers(serverid),
+      pattern text,
+      is_regex boolean DEFAULT FALSE,
+      addtime TIMESTAMP DEFAULT current_timestamp,
+      PRIMARY KEY (serverid, pattern)
+    );"""
+
+    # Partitioned by month on createdat, partitions are created on demand
+    # by PostgresController.ensure_message_partitions
+    messages = f"""
+    CREATE TABLE IF NOT EXISTS {schema}.messages (
+      serverid BIGINT,
+      messageid BIGINT,
+      authorid BIGINT,
+      channelid BIGINT,
+      bot BOOLEAN,
+      pinned BOOLEAN,
+      content TEXT,
+      createdat TIMESTAMP NOT NULL
+    ) PARTITION BY RANGE (createdat);"""
+
+    await conn.execute(servers)
+    await conn.execute(voice_roles)
+    await conn.execute(voice_logging)
+    await conn.execute(role_greetings)
+    await conn.execute(modlog_channels)
+    await conn.execute(welcome_channels)
+    await conn.execute(logging_channels)
+    await conn.execute(assignableroles)
+    await conn.execute(blacklist_channels)
+    await conn.execute(warnings)
+    await conn.execute(moderation)
+    await conn.execute(autoassign)
+    await conn.execute(slowchannels)
+    await conn.execute(filter_words)
+    await conn.execute(messages)
+
+
+async def split_legacy_arrays(conn, schema: str):
+    """
+    Version 2, replaces 2019-05-09-refactor_db.py.
+    Moves the old per-server arrays and the old roles table into their
+    own tables in one statement each, enables modlog, logging and voice
+    logging for servers that had channels for them, then drops the old
+    columns.
+    Does nothing on databases created after the refactor.
+    :param conn: the connection to run on.
+    :param schema: the schema name.
+    """
+    columns = {
+        row['column_name']: row['data_type']
+        for row in await conn.fetch("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = $1 AND table_name = 'servers';
+        """, schema)
+    }
+    legacy = [
+        entry for entry in LEGACY_SERVER_COLUMNS if entry[0] in columns
+    ]
+    for column, table, target, flag in legacy:
+        await conn.execute("""
+        INSERT INTO {0}.{2} (serverid, {3})
+        SELECT serverid, unnest({1}) FROM {0}.servers
+        ON CONFLICT DO NOTHING;
+        """.format(schema, column, table, target))
+        if flag:
+            await conn.execute("""
+            UPDATE {0}.servers SET {2} = TRUE
+            WHERE cardinality({1}) > 0;
+            """.format(schema, column, flag))
+    if legacy:
+        await conn.execute('ALTER TABLE {}.servers {};'.format(
+            schema,
+            ', '.join(f'DROP COLUMN {column}' for column, *_ in legacy)
+        ))
+
+    has_roles = await conn.fetchval(
+        'SELECT to_regclass($1) IS NOT NULL;', f'{schema}.roles')
+    if has_roles:
+        await conn.execute("""
+        INSERT INTO {0}.voice_roles (serverid, role_id, channel_id)
+        SELECT serverid, roleid, unnest(channels) FROM {0}.roles
+        ON CONFLICT DO NOTHING;
+        """.format(schema))
+        await conn.execute('DROP TABLE {}.roles;'.format(schema))
+
+    addtime = columns.get('addtime')
+    if addtime and addtime != 'timestamp without time zone':
+        await conn.execute("""
+        ALTER TABLE {}.servers
+        ALTER COLUMN addtime TYPE TIMESTAMP USING addtime::timestamp,
+        ALTER COLUMN addtime SET DEFAULT current_timestamp;
+        """.format(schema))
+
+
+async def add_lookup_indexes(conn, schema: str):
+    """
+    Version 3, indexes for the lookups the primary keys don't cover.
+    Settings tables aren't indexed, they are only read by the startup
+    aggregate and every other lookup is answered from the cache.
+    :param conn: the connection to run on.
+    :param schema: the schema name.
+    """
+    # *_recent_page and *_has_older filter a user's history on logtime,
+    # the primary key only orders it by index
+    await conn.execute("""
+    CREATE INDEX IF NOT EXISTS moderation_logtime_idx
+    ON {0}.moderation (serverid, userid, logtime);
+    """.format(schema))
+    await conn.execute("""
+    CREATE INDEX IF NOT EXISTS warnings_logtime_idx
+    ON {0}.warnings (serverid, userid, logtime);
+    """.format(schema))
+
+
+async def add_raid_threshold(conn, schema: str):
+    """
+    Version 4, per server override of the raid join threshold.
+    NULL means the raid_join_threshold from the config applies.
+    :param conn: the connection to run on.
+    :param schema: the schema name.
+    """
+    await conn.execute("""
+    ALTER TABLE {}.servers
+    ADD COLUMN IF NOT EXISTS raid_join_threshold INTEGER;
+    """.format(schema))
+
+
+MIGRATIONS = (
+    Migration(1, 'create tables', create_tables),
+    Migration(2, 'split legacy server arrays', split_legacy_arrays),
+    Migration(3, 'add lookup indexes', add_lookup_indexes),
+    Migration(4, 'add raid join threshold', add_raid_threshold),
+)
+
+
+async def get_schema_version(pool, schema: str) -> int:
+    """
+    Returns the latest applied migration, 0 for an unversioned database
+    :param pool: the connection pool.
+    :param schema: the schema name.
+    """
+    versioned = await pool.fetchval(
+        'SELECT to_regclass($1) IS NOT NULL;', f'{schema}.schema_version')
+    if not versioned:
+        return 0
+    return await pool.fetchval(
+        'SELECT COALESCE(MAX(version), 0) FROM {}.schema_version;'
+        .format(schema))
+
+
+async def migrate(pool, schema: str, logger) -> int:
+    """
+    Brings the schema up to the latest version
+    :param pool: the connection pool.
+    :param schema: the schema name.
+    :param logger: logger to report progress to.
+    :return: the number of migrations applied
+    """
+    version = await get_schema_version(pool, schema)
+    latest = MIGRATIONS[-1].version
+    if version >= latest:
+        logger.info(f'Schema is current at version {version}.')
+        return 0
+    logger.info(f'Migrating schema from version {version} to {latest}...')
+    applied = 0
+    async with pool.acquire() as conn:
+        await conn.execute("""
+        CREATE SCHEMA IF NOT EXISTS {0};
+        CREATE TABLE IF NOT EXISTS {0}.schema_version (
+          version INT,
+          description TEXT,
+          applied TIMESTAMP DEFAULT current_timestamp,
+          PRIMARY KEY (version)
+        );
+        """.format(schema))
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+            start = time.perf_counter()
+            async with conn.transaction():
+                # migrations may legitimately outlast the pool's
+                # statement_timeout, including the wait for the lock
+                await conn.execute('SET LOCAL statement_timeout = 0;')
+                await conn.execute(
+                    'SELECT pg_advisory_xact_lock($1);', MIGRATION_LOCK)
+                done = await conn.fetchval("""
+                SELECT EXISTS (
+                    SELECT 1 FROM {}.schema_version WHERE version = $1
+                );
+                """.format(schema), migration.version)
+                if done:
+                    continue
+                await migration.apply(conn, schema)
+                await conn.execute("""
+                INSERT INTO {}.schema_version (version, description)
+                VALUES ($1, $2);
+                """.format(schema), migration.version, migration.description)
+            applied += 1
+            logger.info(
+                f'Applied migration {migration.version} '
+                f'({migration.description}) in '
+                f'{(time.perf_counter() - start) * 1000:.0f}ms.')
+    return applied
@@ -0,0 +1,440 @@
+"""
+Named queries for PostgresController.
+Every query is rendered for the schema once, when the registry is built,
+so the text sent for a name never changes and each call skips the string
+formatting. The hot ones, the queries moderation and warning commands
+run, are prepared on every new pool connection so their first use on a
+connection doesn't pay for parsing and planning.
+Queries that depend on runtime values (partition DDL, channel cleanup)
+are still built where they are used.
+"""
+from .metrics import PoolMetrics
+
+HISTORY_TABLES = ('warnings', 'moderation')
+
+QUERIES = {
+    'get_guild_configs': """
+    SELECT servers.*,
+    modlog.channels AS modlog_channels,
+    logging.channels AS logging_channels,
+    voice.channels AS voice_channels,
+    welcome.channels AS welcome_channels,
+    blacklist.channels AS blacklist_channels,
+    slowmode.channels AS slowmode_channels,
+    autoassign.roles AS autoassign_roles,
+    assignable.roles AS assignable_roles,
+    vc_roles.channels AS voice_role_channels,
+    vc_roles.roles AS voice_role_roles,
+    greetings.channels AS greeting_channels,
+    greetings.roles AS greeting_roles,
+    greetings.messages AS greeting_messages,
+    filters.patterns AS filter_patterns,
+    filters.is_regex AS filter_is_regex
+    FROM {0}.servers AS servers
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels
+        FROM {0}.modlog_channels GROUP BY serverid
+    ) AS modlog USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels
+        FROM {0}.logging_channels GROUP BY serverid
+    ) AS logging USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels
+        FROM {0}.voice_logging GROUP BY serverid
+    ) AS voice USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels
+        FROM {0}.welcome_channels GROUP BY serverid
+    ) AS welcome USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels
+        FROM {0}.blacklist_channels GROUP BY serverid
+    ) AS blacklist USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channelid) AS channels
+        FROM {0}.slowmode GROUP BY serverid
+    ) AS slowmode USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(role_id) AS roles
+        FROM {0}.autoassign GROUP BY serverid
+    ) AS autoassign USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(role_id) AS roles
+        FROM {0}.assignable_roles GROUP BY serverid
+    ) AS assignable USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels,
+        array_agg(role_id) AS roles
+        FROM {0}.voice_roles GROUP BY serverid
+    ) AS vc_roles USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(channel_id) AS channels,
+        array_agg(role_id) AS roles, array_agg(greeting) AS messages
+        FROM {0}.role_greetings GROUP BY serverid
+    ) AS greetings USING (serverid)
+    LEFT JOIN (
+        SELECT serverid, array_agg(pattern) AS patterns,
+        array_agg(is_regex) AS is_regex
+        FROM {0}.filter_words GROUP BY serverid
+    ) AS filters USING (serverid);
+    """,
+    'add_server': """
+    INSERT INTO {0}.servers VALUES
+    ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+    ON CONFLICT (serverid)
+    DO nothing;
+    """,
+    'get_server_ids': """
+    SELECT serverid FROM {0}.servers;
+    """,
+    'add_servers': """
+    INSERT INTO {0}.servers (
+      serverid, prefix, voice_enabled, invites_allowed, voice_logging,
+      modlog_enabled, welcome_message, logging_enabled, ban_footer,
+      kick_footer, addtime
+    )
+    SELECT guild_id, '-', FALSE, TRUE, FALSE, FALSE, $2, FALSE, $3, $3,
+    current_timestamp
+    FROM unnest($1::bigint[]) AS guild_id
+    ON CONFLICT (serverid)
+    DO nothing;
+    """,
+    'add_filter_word': """
+    INSERT INTO {0}.filter_words
+    VALUES ($1, $2, $3)
+    ON CONFLICT (serverid, pattern)
+    DO UPDATE SET is_regex = $3;
+    """,
+    'rem_filter_word': """
+    DELETE FROM {0}.filter_words
+    WHERE serverid = $1
+    AND pattern = $2;
+    """,
+    'add_assignable_role': """
+    INSERT INTO {0}.assignable_roles
+    VALUES ($1, $2)
+    ON CONFLICT (role_id)
+    DO nothing;
+    """,
+    'remove_assignable_role': """
+    DELETE from {0}.assignable_roles
+    WHERE serverid = $1
+    AND role_id = $2
+    """,
+    'add_modlog_channel': """
+    INSERT INTO {0}.modlog_channels
+    VALUES ($1, $2)
+    ON CONFLICT (channel_id)
+    DO nothing;
+    """,
+    'set_modlog_enabled': """
+    UPDATE {0}.servers
+    SET modlog_enabled = $1
+    WHERE serverid = $2;
+    """,
+    'rem_modlog_channel': """
+    DELETE FROM {0}.modlog_channels
+    WHERE serverid = $1
+    AND channel_id = $2;
+    """,
+    'set_prefix': """
+    UPDATE {0}.servers
+    SET prefix = $1
+    WHERE serverid = $2;
+    """,
+    'set_raid_join_threshold': """
+    UPDATE {0}.servers
+    SET raid_join_threshold = $1
+    WHERE serverid = $2;
+    """,
+    'set_welcome_message': """
+    UPDATE {0}.servers
+    SET welcome_message = $1
+    WHERE serverid = $2
+    """,
+    'set_ban_footer': """
+    UPDATE {0}.servers
+    SET ban_footer = $1
+    WHERE serverid = $2
+    """,
+    'set_kick_footer': """
+    UPDATE {0}.servers
+    SET kick_footer = $1
+    WHERE serverid = $2
+    """,
+    'add_welcome_channel': """
+    INSERT INTO {0}.welcome_channels
+    VALUES ($1, $2)
+    ON CONFLICT (channel_id)
+    DO nothing;
+    """,
+    'rem_welcome_channel': """
+    DELETE FROM {0}.welcome_channels
+    WHERE serverid = $1
+    AND channel_id = $2;
+    """,
+    'add_logger_channel': """
+    INSERT INTO {0}.logging_channels
+    VALUES ($1, $2)
+    ON CONFLICT (channel_id)
+    DO nothing;
+    """,
+    'set_logging_enabled': """
+    UPDATE {0}.servers
+    SET logging_enabled = $1
+    WHERE serverid = $2;
+    """,
+    'rem_logger_channel': """
+    DELETE FROM {0}.logging_channels
+    WHERE serverid = $1
+    AND channel_id = $2;
+    """,
+    'add_voice_channel': """
+    INSERT INTO {0}.voice_logging
+    VALUES ($1, $2)
+    ON CONFLICT (channel_id)
+    DO nothing;
+    """,
+    'set_voice_logging': """
+    UPDATE {0}.servers
+    SET voice_logging = $1
+    WHERE serverid = $2;
+    """,
+    'rem_voice_channel': """
+    DELETE FROM {0}.voice_logging
+    WHERE serverid = $1
+    AND channel_id = $2;
+    """,
+    'add_role_channel': """
+    INSERT INTO {0}.voice_roles VALUES ($1, $2, $3)
+    ON CONFLICT (role_id, channel_id) DO NOTHING;
+    """,
+    'rem_role_channel': """
+    DELETE FROM {0}.voice_roles
+    WHERE channel_id = $1 AND role_id = $2
+    """,
+    'purge_voice_roles': """
+    DELETE FROM {0}.voice_roles
+    WHERE serverid = $1;
+    """,
+    'set_voice_enabled': """
+    UPDATE {0}.servers
+    SET voice_enabled = $1
+    WHERE serverid = $2;
+    """,
+    'set_invites_allowed': """
+    UPDATE {0}.servers
+    SET invites_allowed = $1
+    WHERE serverid = $2;
+    """,
+    'add_blacklist_channel': """
+    INSERT INTO {0}.blacklist_channels
+    VALUES ($1, $2)
+    ON CONFLICT (channel_id)
+    DO nothing;
+    """,
+    'rem_blacklist_channel': """
+    DELETE FROM {0}.blacklist_channels
+    WHERE serverid = $1
+    AND channel_id = $2;
+    """,
+    'get_moderation_count': """
+    SELECT COUNT(userid) FROM {0}.moderation
+    WHERE serverid = $1 AND userid = $2;
+    """,
+    'insert_modaction': """
+    INSERT INTO {0}.moderation
+    (serverid, moderatorid, userid, indexid, action, reason)
+    SELECT $1, $2, $3, COALESCE(MAX(indexid), 0) + 1, $4, $5
+    FROM {0}.moderation
+    WHERE serverid = $1 AND userid = $3
+    RETURNING indexid;
+    """,
+    'get_single_modaction': """
+    SELECT * FROM {0}.moderation
+    WHERE serverid = $1 AND userid = $2 AND indexid = $3;
+    """,
+    'set_single_modaction': """
+    UPDATE {0}.moderation
+    SET reason=$1, moderatorid=$2, action=$3 WHERE serverid = $4 AND userid = $5 AND indexid = $6;
+    """,
+    'delete_single_modaction': """
+    DELETE FROM {0}.moderation
+    WHERE serverid = $1 AND userid = $2 AND indexid = $3;
+    """,
+    'get_warning_count': """
+    SELECT COUNT(userid) FROM {0}.warnings
+    WHERE serverid = $1 AND userid = $2;
+    """,
+    'add_warning': """
+    WITH prior AS (
+        SELECT COALESCE(MAX(indexid), 0) + 1 AS next_index,
+        COUNT(userid) AS total
+        FROM {0}.warnings
+        WHERE serverid = $1 AND userid = $2
+    ), inserted AS (
+        INSERT INTO {0}.warnings (serverid, userid, indexid, reason, major)
+        SELECT $1, $2, next_index, $3, $4 FROM prior
+        RETURNING indexid
+    )
+    SELECT total FROM prior, inserted;
+    """,
+    'get_single_warning': """
+    SELECT * FROM {0}.warnings
+    WHERE serverid = $1 AND userid = $2 AND indexid = $3;
+    """,
+    'set_single_warning': """
+    UPDATE {0}.warnings
+    SET reason=$1, major=$2 WHERE serverid = $3 AND userid = $4 AND indexid = $5;
+    """,
+    'delete_single_warning': """
+    DELETE FROM {0}.warnings
+    WHERE serverid = $1 AND userid = $2 AND indexid = $3;
+    """,
+    'add_slowmode_channel': """
+    INSERT INTO {0}.slowmode VALUES ($1, $2, $3);
+    """,
+    'rem_slowmode_channel': """
+    DELETE FROM {0}.slowmode
+    WHERE serverid = $1 AND channelid = $2;
+    """,
+    'get_slowmode_channels': """
+    SELECT * FROM {0}.slowmode;
+    """,
+    'add_autoassign_role': """
+    INSERT INTO {0}.autoassign
+    VALUES ($1, $2)
+    ON CONFLICT (role_id)
+    DO nothing;
+    """,
+    'remove_autoassign_role': """
+    DELETE from {0}.autoassign
+    WHERE serverid = $1
+    AND role_id = $2
+    """,
+    'set_role_greeting': """
+    INSERT INTO {0}.role_greetings
+    VALUES ($1, $2, $3, $4)
+    """,
+    'del_role_greeting': """
+    DELETE from {0}.role_greetings
+    WHERE channel_id = $1
+    AND role_id = $2
+    """,
+    'get_server': """
+    SELECT * FROM {0}.servers as servers
+    WHERE serverid = $1
+    """,
+}
+
+for table in HISTORY_TABLES:
+    QUERIES[f'{table}_page'] = """
+    SELECT * FROM {{0}}.{table}
+    WHERE serverid = $1 AND userid = $2 AND indexid > $3
+    ORDER BY indexid LIMIT $4;
+    """.format(table=table)
+    # walks the (serverid, userid, logtime) index from the later of the
+    # cursor and the 6 month cutoff, so old history is never scanned
+    QUERIES[f'{table}_recent_page'] = """
+    SELECT * FROM {{0}}.{table}
+    WHERE serverid = $1 AND userid = $2
+    AND logtime >= GREATEST(
+        $3::timestamp, DATE_TRUNC('month', now()) - INTERVAL '6 month')
+    AND (logtime, indexid) > ($3::timestamp, $4)
+    ORDER BY logtime, indexid LIMIT $5;
+    """.format(table=table)
+    QUERIES[f'{table}_has_older'] = """
+    SELECT EXISTS (
+        SELECT 1 FROM {{0}}.{table}
+        WHERE serverid = $1 AND userid = $2
+        AND logtime < DATE_TRUNC('month', now()) - INTERVAL '6 month'
+    );
+    """.format(table=table)
+
+# Prepared on every new connection. Only queries read through
+# fetch/fetchrow/fetchval, asyncpg's prepared statements can't execute
+HOT_QUERIES = (
+    'insert_modaction',
+    'add_warning',
+    'get_moderation_count',
+    'get_warning_count',
+    'get_single_modaction',
+    'get_single_warning',
+) + tuple(
+    f'{table}_{kind}' for table in HISTORY_TABLES
+    for kind in ('page', 'recent_page', 'has_older')
+)
+
+
+class QueryRegistry():
+    """
+    Every query rendered for one schema, run by name
+    `prepare` is the pool's `init` hook. Connections without prepared
+    statements, and queries that aren't hot, send the rendered text,
+    which asyncpg's own statement cache still reuses as it never changes
+    """
+    __slots__ = ('sql', 'hot', 'pool', 'metrics', 'ready', 'statements')
+
+    def __init__(self, schema: str, queries: dict = QUERIES,
+                 hot: tuple = HOT_QUERIES, metrics: PoolMetrics = None):
+        self.sql = {
+            name: query.format(schema) for name, query in queries.items()}
+        self.hot = hot
+        self.pool = None
+        self.metrics = metrics or PoolMetrics()
+        # set once the schema is migrated, before that the tables the
+        # hot queries use might not exist yet
+        self.ready = False
+        # server pid of a connection -> {name: PreparedStatement}
+        self.statements = {}
+
+    def is_prepared(self, con) -> bool:
+        return con.get_server_pid() in self.statements
+
+    async def prepare(self, con):
+        """
+        Prepares the hot queries on a new connection
+        :param con: the connection
+        """
+        if not self.ready:
+            return
+        pid = con.get_server_pid()
+        statements = {}
+        for name in self.hot:
+            statements[name] = await con.prepare(self.sql[name])
+        self.statements[pid] = statements
+
+        def forget(_):
+            if self.statements.get(pid) is statements:
+                del self.statements[pid]
+
+        con.add_termination_listener(forget)
+
+    async def run(self, method: str, name: str, *args):
+        """
+        Runs a query by name on a pool connection
+        :param method: one of fetch, fetchrow or fetchval
+        :param name: name of the query
+        """
+        async with self.metrics.acquire(self.pool) as con:
+            statement = self.statements.get(
+                con.get_server_pid(), {}).get(name)
+            with self.metrics.timed(name):
+                if statement is None:
+                    return await getattr(con, method)(self.sql[name], *args)
+                return await getattr(statement, method)(*args)
+
+    async def fetch(self, name: str, *args):
+        return await self.run('fetch', name, *args)
+
+    async def fetchrow(self, name: str, *args):
+        return await self.run('fetchrow', name, *args)
+
+    async def fetchval(self, name: str, *args):
+        return await self.run('fetchval', name, *args)
+
+    async def execute(self, name: str, *args):
+        async with self.metrics.acquire(self.pool) as con:
+            with self.metrics.timed(name):
+                return await con.execute(self.sql[name], *args)
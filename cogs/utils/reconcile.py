@@ -0,0 +1,66 @@
+"""
+Keeps the servers table in line with the guilds the bot is in.
+Guilds joined while the bot was offline never get a settings row, the
+reconciler finds them with a single query and inserts them in one batch.
+"""
+import asyncio
+import time
+
+
+class GuildReconciler():
+    """
+    Adds missing guilds to the db at startup and every `interval` seconds
+    """
+    __slots__ = ('bot', 'interval', 'task')
+
+    def __init__(self, bot, interval: float = 3600):
+        self.bot = bot
+        self.interval = interval
+        self.task = None
+
+    def start(self, loop):
+        """
+        Starts the periodic reconcile task, the first run is immediate
+        :param loop: the event loop to run on
+        """
+        if self.task is None:
+            self.task = loop.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                self.bot.logger.warning(f'Error reconciling guilds: {e}')
+            await asyncio.sleep(self.interval)
+
+    async def find_missing(self) -> list:
+        """
+        Returns the ids of guilds the bot is in that have no servers row
+        """
+        known = await self.bot.pg_utils.get_server_ids()
+        return [guild.id for guild in self.bot.guilds
+                if guild.id not in known]
+
+    async def reconcile(self, dry_run: bool = False):
+        """
+        Inserts every missing guild
+        :param dry_run: only count the missing guilds
+        :return: (missing guild ids, number inserted, seconds taken)
+        """
+        start = time.perf_counter()
+        missing = await self.find_missing()
+        added = 0
+        if missing and not dry_run:
+            added = await self.bot.pg_utils.add_servers(missing)
+        duration = time.perf_counter() - start
+        self.bot.logger.info(
+            f'Guild reconcile: {len(self.bot.guilds)} guilds, '
+            f'{len(missing)} missing, {added} added in '
+            f'{duration * 1000:.0f}ms')
+        return missing, added, duration
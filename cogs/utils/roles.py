@@ -0,0 +1,157 @@
+"""
+Per-guild role index.
+Roles are indexed by normalized name the first time a guild is looked
+up, then kept current from the role create/update/delete events, so
+resolving a role by name never walks `guild.roles`.
+discord.py rebuilds its guild and role objects after READY without
+firing role events, so the bot drops an index whenever a guild becomes
+available again, and every hit is checked against the guild's own
+roles before it is returned. A miss is trusted, so a misspelled name
+costs one dict lookup.
+"""
+
+
+def normalize(name: str) -> str:
+    """
+    Returns the key a role name is indexed under
+    :param name: the role name or user input
+    """
+    return name.lower()
+
+
+class GuildRoles():
+    """
+    Roles of a single guild keyed by normalized name
+    Several roles can share a name, `find` picks the highest or lowest
+    """
+    __slots__ = ('by_name',)
+
+    def __init__(self, roles=()):
+        self.by_name = {}
+        for role in roles:
+            self.add(role)
+
+    def add(self, role):
+        self.by_name.setdefault(normalize(role.name), {})[role.id] = role
+
+    def remove(self, role_id: int, name: str):
+        """
+        Drops a role from the index
+        :param role_id: id of the role
+        :param name: name the role was indexed under
+        """
+        key = normalize(name)
+        named = self.by_name.get(key)
+        if named is None:
+            return
+        named.pop(role_id, None)
+        if not named:
+            del self.by_name[key]
+
+    def find(self, name: str, highest: bool = True):
+        """
+        Returns the role with the given name, ignoring case
+        :param name: the role name to look for
+        :param highest: which role to return when several share the
+        name, the highest or the lowest in the role list
+        """
+        named = self.by_name.get(normalize(name))
+        if not named:
+            return None
+        if len(named) == 1:
+            return next(iter(named.values()))
+        pick = max if highest else min
+        return pick(named.values(), key=lambda role: role.position)
+
+
+class RoleIndex():
+    """
+    Lazily built GuildRoles for every guild the bot resolves roles in
+    """
+    __slots__ = ('guilds',)
+
+    def __init__(self):
+        self.guilds = {}
+
+    def guild(self, guild) -> GuildRoles:
+        """
+        Returns the index for a guild, building it on first use
+        :param guild: the discord guild object
+        """
+        try:
+            return self.guilds[guild.id]
+        except KeyError:
+            return self.rebuild(guild)
+
+    def rebuild(self, guild) -> GuildRoles:
+        """
+        Replaces a guild's index with a fresh one from `guild.roles`
+        :param guild: the discord guild object
+        """
+        roles = self.guilds[guild.id] = GuildRoles(guild.roles)
+        return roles
+
+    def get(self, guild, role_id: int):
+        """
+        Returns the role with the given id or None
+        The guild's own role map is already keyed by id
+        :param guild: the discord guild object
+        :param role_id: id of the role
+        """
+        return guild.get_role(role_id)
+
+    def find(self, guild, name: str, highest: bool = True):
+        """
+        Returns the role with the given name or None
+        When several roles share the name the highest is returned, as the
+        commands that looped over `guild.roles` kept the last match
+        A hit that isn't the guild's current role object rebuilds the
+        index once in case it went stale
+        :param guild: the discord guild object
+        :param name: the role name, case doesn't matter
+        :param highest: False returns the lowest of same named roles
+        """
+        roles = self.guilds.get(guild.id)
+        if roles is None:
+            return self.rebuild(guild).find(name, highest)
+        role = roles.find(name, highest)
+        if role is None or guild.get_role(role.id) is role:
+            return role
+        return self.rebuild(guild).find(name, highest)
+
+    def resolve(self, guild, role_ids) -> list:
+        """
+        Returns the roles for every id that still exists in the guild
+        :param guild: the discord guild object
+        :param role_ids: iterable of role ids
+        """
+        return [
+            role for role in map(guild.get_role, role_ids)
+            if role is not None
+        ]
+
+    def role_created(self, role):
+        roles = self.guilds.get(role.guild.id)
+        if roles is not None:
+            roles.add(role)
+
+    def role_updated(self, before, after):
+        roles = self.guilds.get(after.guild.id)
+        if roles is not None:
+            roles.remove(before.id, before.name)
+            roles.add(after)
+
+    def role_deleted(self, role):
+        roles = self.guilds.get(role.guild.id)
+        if roles is not None:
+            roles.remove(role.id, role.name)
+
+    def forget(self, guild_id: int):
+        """
+        Drops a guild's index, it is rebuilt the next time it is used
+        :param guild_id: id of the guild
+        """
+        self.guilds.pop(guild_id, None)
+
+    def clear(self):
+        self.guilds.clear()
@@ -0,0 +1,86 @@
+"""
+Startup helpers.
+Retries with exponential backoff without blocking the event loop, and
+times each startup phase so slow restarts show where the time went.
+"""
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer():
+    """
+    Records how long each startup phase took
+    """
+    __slots__ = ('logger', 'phases', 'started', 'last')
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.phases = []
+        self.started = self.last = time.perf_counter()
+
+    def record(self, name: str, elapsed: float):
+        """
+        Records a finished phase
+        :param name: name of the phase
+        :param elapsed: seconds it took
+        """
+        self.phases.append((name, elapsed))
+        self.last = time.perf_counter()
+        if self.logger:
+            self.logger.info(
+                f'Startup phase {name} took {elapsed * 1000:.0f}ms')
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the code inside the with block as one phase
+        :param name: name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def since_last(self) -> float:
+        """Seconds since the last phase finished"""
+        return time.perf_counter() - self.last
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self.started
+        phases = ', '.join(
+            f'{name} {elapsed * 1000:.0f}ms' for name, elapsed in self.phases)
+        return f'Started in {total * 1000:.0f}ms ({phases})'
+
+
+async def retry_with_backoff(factory, logger, what: str,
+                             base_delay: float = 1.0, max_delay: float = 60.0,
+                             max_attempts: int = 10):
+    """
+    Awaits `factory()` until it succeeds, sleeping exponentially longer
+    (with jitter) between attempts.
+    :param factory: coroutine function to call
+    :param logger: logger to report failures to
+    :param what: description of what is being attempted
+    :param max_attempts: attempts before giving up, 0 retries forever
+    :return: whatever `factory` returns
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await factory()
+        except Exception as e:
+            if max_attempts and attempt >= max_attempts:
+                logger.critical(
+                    f'Error {what} - giving up after {attempt} attempts')
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            logger.critical(
+                f'Error {what} - attempt {attempt}, '
+                f'trying again in {delay:.1f} seconds')
+            logger.debug(f'Error: {e}')
+            await asyncio.sleep(delay)
@@ -0,0 +1,59 @@
+"""
+Message templates for welcome messages and role greetings.
+A template is split into literal text and placeholders once, rendering
+it for a member is then a single join. Compiled templates are cached
+by their source, so each guild's message is only parsed when it changes.
+"""
+import re
+from functools import lru_cache
+
+# placeholder name -> function of the member it is rendered for
+PLACEHOLDERS = {
+    'user': lambda member: member.mention,
+    'username': lambda member: member.name,
+    'server': lambda member: member.guild.name,
+    'membercount': lambda member: str(member.guild.member_count),
+}
+
+# Only the known names, case-sensitive like the old chained replaces, so
+# other text between percent signs can't swallow a placeholder's `%`
+PLACEHOLDER_REGEX = re.compile('%({})%'.format('|'.join(
+    sorted(map(re.escape, PLACEHOLDERS), key=len, reverse=True))))
+
+
+class MessageTemplate():
+    """
+    A parsed template
+    `parts` alternates literal text and placeholder functions
+    """
+    __slots__ = ('source', 'parts')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.parts = []
+        pieces = PLACEHOLDER_REGEX.split(source)
+        for index, piece in enumerate(pieces):
+            if index % 2 == 0:
+                if piece:
+                    self.parts.append(piece)
+            else:
+                self.parts.append(PLACEHOLDERS[piece])
+
+    def render(self, member) -> str:
+        """
+        Fills in the template for a member
+        :param member: the discord member the message is about
+        """
+        return ''.join(
+            part if isinstance(part, str) else part(member)
+            for part in self.parts
+        )
+
+
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> MessageTemplate:
+    """
+    Returns the compiled template for a message
+    :param source: the message as set by the guild
+    """
+    return MessageTemplate(source)
@@ -1,4 +1,5 @@
 """Handle Voiceroles, channel changes, and status changes."""
+import asyncio
 import discord
 from .utils import checks, embeds
 from discord.ext import commands
@@ -11,6 +12,18 @@ class Voice(commands.Cog):
         """Init method."""
         super().__init__()
         self.bot = bot
+        self.role_window = bot.voice_role_window
+        # (guild_id, member_id) -> task waiting out the window
+        self.pending = {}
+        # (guild_id, member_id) -> [lock held while editing roles,
+        # number of tasks holding or waiting on it]
+        self.locks = {}
+
+    def cog_unload(self):
+        """Drop any role edits still waiting."""
+        for task in self.pending.values():
+            task.cancel()
+        self.pending.clear()
 
     @commands.group(aliases=['vcrole'])
     @commands.guild_only()
@@ -49,10 +62,7 @@ class Voice(commands.Cog):
             )
             await ctx.send(embed=local_embed)
             return
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if not found_role:
             local_embed = discord.Embed(
                 title=f'Couldn\'t find role {role_name}',
@@ -102,10 +112,7 @@ class Voice(commands.Cog):
             )
             await ctx.send(embed=local_embed)
             return
-        found_role = None
-        for role in ctx.guild.roles:
-            if role.name.lower() == role_name.lower():
-                found_role = role
+        found_role = self.bot.role_index.find(ctx.guild, role_name)
         if not found_role:
             local_embed = discord.Embed(
                 title=f'Couldn\'t find role {role_name}',
@@ -159,69 +166,85 @@ class Voice(commands.Cog):
         except Exception as e:
             self.bot.logger.warning(f'Error deleting voice role: {e}')
 
+    def voice_role_delta(self, member, channel):
+        """
+        Returns the (added, removed) role ids that bring a member's roles
+        in line with the voice channel they are in, using the cached
+        channel to role map.
+        """
+        config = self.bot.pg_utils.cache.get(member.guild.id)
+        wanted = config.voice_roles.get(channel.id, frozenset()) \
+            if channel else frozenset()
+        current = {role.id for role in member.roles}
+        added = wanted - current
+        removed = (current & config.all_voice_roles()) - wanted
+        return added, removed
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """Listen for voice channel changes and apply role if applicable."""
-        vc_enabled = await self.bot.pg_utils.get_voice_enabled(
-            member.guild.id)
-        if not vc_enabled:
+        """A burst of updates for one member restarts the window each
+        time, only the state they end up in gets applied."""
+        if not self.bot.pg_utils.cache.get(member.guild.id).voice_enabled:
             return
-        users_roles = member.roles.copy()
-        if before.channel is None and after.channel:
-            vc_roles = await self.bot.pg_utils.get_channel_roles(
-                member.guild.id, after.channel.id
-            )
-            for vc_role in vc_roles:
-                found_role = None
-                for role in member.guild.roles:
-                    if role.id == vc_role:
-                        found_role = role
-                if not found_role:
-                    self.bot.logger.warning(
-                        f'Couldn\'t find {vc_role} in guild {member.guild.id}')
-                    continue
-                users_roles.append(found_role)
-            await member.edit(roles=set(users_roles))
-        elif after.channel is None and before.channel:
-            vc_roles = await self.bot.pg_utils.get_channel_roles(
-                member.guild.id, before.channel.id
-            )
-            for vc_role in vc_roles:
-                for role in users_roles:
-                    if role.id == vc_role:
-                        try:
-                            users_roles.remove(role)
-                        except ValueError:
-                            self.bot.logger.warning(
-                                f'{vc_role} not found in {users_roles}')
-            await member.edit(roles=set(users_roles))
-        else:
-            vc_roles = await self.bot.pg_utils.get_server_roles(
-                member.guild.id
-            )
-            for vc_role in vc_roles:
-                for role in users_roles:
-                    if role.id == vc_role:
-                        try:
-                            users_roles.remove(role)
-                        except ValueError:
-                            self.bot.logger.warning(
-                                f'{vc_role} not found in {users_roles}')
-            vc_roles = await self.bot.pg_utils.get_channel_roles(
-                member.guild.id, after.channel.id
-            )
-            for vc_role in vc_roles:
-                found_role = None
-                for role in member.guild.roles:
-                    if role.id == vc_role:
-                        found_role = role
-                if not found_role:
-                    self.bot.logger.warning(
-                        f'Couldn\'t find {vc_role} in guild {member.guild.id}')
-                    continue
-                users_roles.append(found_role)
-            await member.edit(roles=set(users_roles))
+        key = (member.guild.id, member.id)
+        if self.role_window <= 0:
+            await self.apply_serialized(key, member.guild)
+            return
+        task = self.pending.pop(key, None)
+        if task:
+            task.cancel()
+        self.pending[key] = self.bot.loop.create_task(
+            self.apply_later(key, member.guild))
 
+    async def apply_later(self, key, guild):
+        """
+        Applies a member's voice roles once the window has passed.
+        """
+        await asyncio.sleep(self.role_window)
+        self.pending.pop(key, None)
+        await self.apply_serialized(key, guild)
+
+    async def apply_serialized(self, key, guild):
+        """
+        Applies a member's voice roles, one edit at a time per member.
+        The lock is only dropped once no task holds or waits on it, so
+        every edit for a member goes through the same lock.
+        """
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                member = guild.get_member(key[1])
+                if member is not None:
+                    await self.apply_voice_roles(member)
+        except Exception as e:
+            self.bot.logger.warning(f'Error applying voice roles: {e}')
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[key]
+
+    async def apply_voice_roles(self, member):
+        """Bring a member's roles in line with their current channel."""
+        """Mutes, deafens and hops between channels with the same roles
+        produce an empty delta and cost no api call."""
+        channel = member.voice.channel if member.voice else None
+        added, removed = self.voice_role_delta(member, channel)
+        if not added and not removed:
+            return
+        users_roles = [role for role in member.roles
+                       if role.id not in removed]
+        added_roles = self.bot.role_index.resolve(member.guild, added)
+        if len(added_roles) != len(added):
+            self.bot.logger.warning(
+                f'Couldn\'t find some of {added} in guild {member.guild.id}')
+        if not added_roles and not removed:
+            return
+        users_roles.extend(added_roles)
+        await member.edit(roles=users_roles)
 
 def setup(bot):
     """General cog loading."""
@@ -1,9 +1,10 @@
 """Generalized warning system."""
 
+import asyncio
 import discord
 from discord.ext import commands
 
-from .utils import checks, embeds
+from .utils import checks, embeds, helpers
 from .utils.functions import GeneralMember
 
 
@@ -14,6 +15,7 @@ class Warnings(commands.Cog):
         """Init method."""
         super().__init__()
         self.bot = bot
+        self.page_size = 10
 
     @commands.group()
     @commands.guild_only()
@@ -147,29 +149,38 @@ class Warnings(commands.Cog):
     @checks.has_permissions(manage_roles=True)
     async def warnings(self, ctx, member: GeneralMember, recent: bool = True):
         """Return all the warnings a user has."""
+        pg_utils = self.bot.pg_utils
         try:
-            warnings = None
-            moderations = None
-            count = [await self.bot.pg_utils.get_warning_count(ctx.guild.id, member.id),  # noqa
-                     await self.bot.pg_utils.get_moderation_count(ctx.guild.id, member.id)]  # noqa
-            warnings = await self.bot.pg_utils.get_warnings(
-                ctx.guild.id,
-                member.id,
-                self.bot.logger,
-                recent=recent)
-            moderations = await self.bot.pg_utils.get_moderation(
-                ctx.guild.id,
-                member.id,
-                self.bot.logger,
-                recent=recent)
-            local_embed = embeds.WarningListEmbed(
-                member, warnings, self.bot.logger, count[0] > len(warnings))
-            await ctx.send(embed=local_embed)
-            if moderations:
-                mod_embed = embeds.ModerationListEmbed(
-                    member, moderations, self.bot.logger,
-                    count[1] > len(moderations))
-                await ctx.send(embed=mod_embed)
+            older = [False, False]
+            if recent:
+                older = await asyncio.gather(
+                    pg_utils.has_older_history(
+                        'warnings', ctx.guild.id, member.id),
+                    pg_utils.has_older_history(
+                        'moderation', ctx.guild.id, member.id))
+
+            async def fetch_warnings(after):
+                return await pg_utils.get_history_page(
+                    'warnings', ctx.guild.id, member.id,
+                    after, self.page_size, recent=recent)
+
+            async def fetch_moderations(after):
+                return await pg_utils.get_history_page(
+                    'moderation', ctx.guild.id, member.id,
+                    after, self.page_size, recent=recent)
+
+            # one reaction wait serves both, the warnings always come first
+            await helpers.paginate(
+                ctx,
+                helpers.Pager(
+                    fetch_warnings,
+                    lambda rows, page: embeds.WarningListEmbed(
+                        member, rows, self.bot.logger, older[0], page)),
+                helpers.Pager(
+                    fetch_moderations,
+                    lambda rows, page: embeds.ModerationListEmbed(
+                        member, rows, self.bot.logger, older[1], page),
+                    skip_empty=True))
         except Exception as e:
             await ctx.send(embed=embeds.InternalErrorEmbed())
             self.bot.logger.warning(f'Error trying to get user warnings: {e}')